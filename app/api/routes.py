@@ -10,20 +10,21 @@ Requirements: 10.1, 10.4, 10.5, 11.1, 11.2
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 import openpyxl
 from io import BytesIO
 import logging
 import os
-from typing import List
+from typing import List, Tuple
 
 from app.core.matcher import HeaderMatcher
-from app.core.parser import parse_row
+from app.core.parser import parse_sheet
 from app.core.preprocessor import find_header_row
-from app.schema.models import ParseResult, ParsedCell
+from app.schema.models import HeaderMapping, ParseResult, ParsedCell
 from app.registry.data import RegistryManager
-from app.services.llm import LLMService
+from app.services.llm import LLMService, count_api_calls
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -67,6 +68,18 @@ def get_matcher() -> HeaderMatcher:
     return _matcher
 
 
+def _match_headers_counting_calls(headers: List[str]) -> Tuple[List[HeaderMapping], int]:
+    """
+    Match headers and count the Gemini requests the match actually sent.
+    
+    Batches answered from the LLM service's cache cost no request, so the
+    count comes from the service rather than from the mapping methods.
+    """
+    with count_api_calls() as api_calls:
+        header_mappings = get_matcher().match_headers(headers)
+    return header_mappings, api_calls.value
+
+
 @router.post("/parse", response_model=ParseResult)
 async def parse_excel(file: UploadFile = File(...)):
     """
@@ -120,7 +133,9 @@ async def parse_excel(file: UploadFile = File(...)):
         # Step 1: Detect table structure
         logger.debug("Step 1: Detecting table structure")
         try:
-            table_structure = find_header_row(sheet, get_llm_service())
+            # Header detection may call Gemini synchronously; run it on the
+            # threadpool so the event loop keeps serving other requests
+            table_structure = await run_in_threadpool(find_header_row, sheet, get_llm_service())
         except ValueError as e:
             logger.error(f"Header row detection failed: {e}")
             raise HTTPException(
@@ -154,24 +169,25 @@ async def parse_excel(file: UploadFile = File(...)):
         
         # Step 3: Match headers (THREE-TIER STRATEGY)
         logger.debug("Step 3: Matching headers using three-tier strategy")
-        header_mappings = get_matcher().match_headers(headers)
+        # Tier 3 blocks on the LLM round-trip, so it runs off the event loop
+        header_mappings, llm_calls_made = await run_in_threadpool(
+            _match_headers_counting_calls, headers
+        )
         
         logger.info(f"Header matching complete: {len(header_mappings)} mappings created")
         
         # Step 4: Parse data rows
         logger.debug("Step 4: Parsing data rows")
-        parsed_data: List[List[ParsedCell]] = []
-        
-        for row_idx in range(table_structure.data_start_row, sheet.max_row + 1):
-            row_values = list(sheet.iter_rows(
-                min_row=row_idx,
-                max_row=row_idx,
-                values_only=True
-            ))[0]
-            
-            # Parse the row with header mappings
-            parsed_cells = parse_row(row_values, header_mappings, row_index=row_idx)
-            parsed_data.append(parsed_cells)
+        # One values-only pass over the data rows rather than an iter_rows
+        # call per row
+        data_rows = sheet.iter_rows(
+            min_row=table_structure.data_start_row,
+            max_row=sheet.max_row,
+            values_only=True
+        )
+        parsed_data: List[List[ParsedCell]] = parse_sheet(
+            data_rows, header_mappings, start_row=table_structure.data_start_row
+        )
         
         logger.info(f"Parsed {len(parsed_data)} data rows")
         
@@ -182,10 +198,6 @@ async def parse_excel(file: UploadFile = File(...)):
             1 for row in parsed_data for cell in row if cell.parse_success
         )
         
-        # Count LLM calls (should be 0 or 1 per file)
-        llm_matched_count = sum(1 for m in header_mappings if m.method.value == "llm")
-        llm_calls_made = 1 if llm_matched_count > 0 else 0
-        
         try:
             result = ParseResult(
                 file_name=file.filename,
@@ -5,16 +5,21 @@ This module implements the HeaderMatcher class which orchestrates
 a three-tier matching strategy:
 1. Tier 1: Fast O(1) exact matching with normalization
 2. Tier 2: Regex-based asset extraction with parameter inference
-3. Tier 3: Batch LLM semantic matching (single call per file)
+3. Tier 3: Batch LLM semantic matching (one call per llm_batch_size
+   unmapped headers)
 
 The matcher ensures efficiency by processing tiers sequentially
-and batching all LLM calls into a single API request per file.
+and batching LLM calls: typical files need a single API request, and
+very large Tier 3 sets are split into batches sent a few at a time.
 
 Requirements: 3.1, 3.2, 3.3, 3.4, 3.5, 4.1, 4.2, 4.3, 4.4, 4.5,
               5.1, 5.2, 5.3, 5.4, 5.5, 15.4
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 from typing import List, Optional, Tuple
+import re
 from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
 from app.registry.data import RegistryManager
 from app.services.llm import LLMService
@@ -31,22 +36,35 @@ class HeaderMatcher:
     The matcher processes headers through three sequential tiers:
     - Tier 1: Normalized exact matching (O(1) lookup)
     - Tier 2: Regex-based asset extraction
-    - Tier 3: Batch LLM semantic matching (one call per file)
+    - Tier 3: Batch LLM semantic matching (one call per llm_batch_size
+      unmapped headers, so one call for typical files)
     
     Each tier only processes headers that failed in previous tiers,
     ensuring efficiency and minimizing LLM API calls.
     """
     
-    def __init__(self, registry: RegistryManager, llm_service: LLMService):
+    def __init__(
+        self,
+        registry: RegistryManager,
+        llm_service: LLMService,
+        llm_batch_size: int = 50,
+        llm_max_workers: int = 4
+    ):
         """
         Initialize the HeaderMatcher with registry and LLM service.
         
         Args:
             registry: RegistryManager instance for parameter/asset lookup
             llm_service: LLMService instance for semantic matching
+            llm_batch_size: Maximum headers per LLM request; larger Tier 3
+                sets are split into batches sent concurrently
+            llm_max_workers: Maximum batches in flight at once, keeping
+                very large files from bursting past the Gemini rate limit
         """
         self.registry = registry
         self.llm_service = llm_service
+        self.llm_batch_size = llm_batch_size
+        self.llm_max_workers = llm_max_workers
         logger.info("HeaderMatcher initialized")
     
     def match_headers(self, headers: List[str]) -> List[HeaderMapping]:
@@ -68,6 +86,15 @@ class HeaderMatcher:
             logger.warning("match_headers called with empty headers list")
             return []
         
+        # Repeated headers are matched once and the mapping is copied to every
+        # occurrence, so duplicates cost no extra tier work or LLM tokens.
+        # The unique list has no repeats, so this recurses at most once.
+        unique_headers = list(dict.fromkeys(headers))
+        if len(unique_headers) < len(headers):
+            logger.info(f"Deduplicated {len(headers)} headers to {len(unique_headers)} unique")
+            by_header = dict(zip(unique_headers, self.match_headers(unique_headers)))
+            return [by_header[header].model_copy() for header in headers]
+        
         logger.info(f"Matching {len(headers)} headers using three-tier strategy")
         
         try:
@@ -195,6 +222,7 @@ class HeaderMatcher:
         """
         matched_param = self.registry.exact_match(header)
         if matched_param:
+            # Normalization is memoized in the registry, so this is a cache hit
             return HeaderMapping(
                 original_header=header,
                 matched_parameter=matched_param,
@@ -220,7 +248,7 @@ class HeaderMatcher:
         """
         asset_match = self.registry.extract_asset(header)
         if asset_match:
-            asset_type, asset_id = asset_match
+            asset_id = asset_match.asset_id
             
             # Try to infer parameter from remaining text
             param = self._infer_parameter_from_context(header, asset_id)
@@ -256,8 +284,10 @@ class HeaderMatcher:
             _infer_parameter_from_context("TG-1 Temperature", "TG-1") -> "Temperature"
             _infer_parameter_from_context("TG-1", "TG-1") -> None
         """
-        # Remove asset identifier from header
-        remaining = header.replace(asset_id, "").strip()
+        # Remove the asset identifier in one case-insensitive substitution, so
+        # "tg-1 Temperature" loses its asset even when asset_id is "TG-1";
+        # re caches the compiled pattern for repeated asset ids
+        remaining = re.sub(re.escape(asset_id), "", header, flags=re.IGNORECASE).strip()
         
         if not remaining:
             return None
@@ -267,11 +297,14 @@ class HeaderMatcher:
     
     def _tier3_llm_match(self, headers: List[str]) -> List[HeaderMapping]:
         """
-        Tier 3: Batch LLM semantic matching (ONE call per file).
+        Tier 3: Batch LLM semantic matching.
         
-        Sends all unmapped headers to the LLM service in a single batch call.
-        This ensures we make exactly one LLM API call per file, regardless
-        of how many headers need semantic matching.
+        Sends all unmapped headers to the LLM service in a single batch call
+        when they fit in llm_batch_size, which covers typical files. Larger
+        sets are split into batches of llm_batch_size that are sent
+        concurrently, at most llm_max_workers at a time, keeping each prompt
+        small and overlapping the network round-trips; results are
+        concatenated back in input order.
         
         Args:
             headers: List of headers that failed Tier 1 and Tier 2
@@ -282,9 +315,29 @@ class HeaderMatcher:
         if not headers:
             return []
         
-        # Single batch call to LLM service
-        return self.llm_service.batch_match_headers(
-            headers,
-            self.registry.parameters,
-            list(self.registry.assets.keys())
-        )
+        parameters = self.registry.parameters
+        assets = list(self.registry.assets.keys())
+        
+        if len(headers) <= self.llm_batch_size:
+            # Single batch call to LLM service
+            return self.llm_service.batch_match_headers(headers, parameters, assets)
+        
+        batches = [
+            headers[start:start + self.llm_batch_size]
+            for start in range(0, len(headers), self.llm_batch_size)
+        ]
+        logger.info(f"Splitting {len(headers)} Tier 3 headers into {len(batches)} LLM batches")
+        
+        # The Gemini client is synchronous, so the batches run on threads;
+        # map() yields results in submission order. Each batch runs in a copy
+        # of the caller's context so count_api_calls sees its requests.
+        max_workers = min(len(batches), self.llm_max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batch_results = executor.map(
+                lambda batch, context: context.run(
+                    self.llm_service.batch_match_headers, batch, parameters, assets
+                ),
+                batches,
+                [contextvars.copy_context() for _ in batches]
+            )
+            return [mapping for batch_result in batch_results for mapping in batch_result]
@@ -3,9 +3,44 @@ Deterministic value parser for Excel cell values.
 NO LLM usage - only regex and string processing.
 """
 
+import math
 import re
-from typing import Any, Optional, Union, List
-from app.schema.models import ParsedCell, HeaderMapping
+from functools import lru_cache
+from pydantic import ConfigDict
+from typing import Any, Iterable, Optional, Union, List, Sequence
+from app.schema.models import ParsedCell, HeaderMapping, MatchMethod, ConfidenceLevel
+
+# Patterns and sentinels compiled once at import rather than on every call
+# Pattern matches: optional negative, digits with optional commas, optional
+# decimal, then an optional % (group 2) - numbers and percentages in one pass
+_NUMBER_RE = re.compile(r'^(-?[\d,]+\.?\d*)(\s*%)?$')
+
+# Upper-cased literal spellings and the value each one parses to
+_LITERAL_VALUES = {
+    "N/A": None,
+    "NA": None,
+    "NULL": None,
+    "NONE": None,
+    "-": None,
+    "YES": 1.0,
+    "NO": 0.0,
+}
+
+# The literals as they are usually typed (upper, lower and title case), so
+# most categorical cells resolve before any strip() or upper() copy is made
+_RAW_LITERAL_VALUES = {
+    spelling: parsed
+    for literal, parsed in _LITERAL_VALUES.items()
+    for spelling in (literal, literal.lower(), literal.title())
+}
+
+# Marks a string that is not one of the literal spellings
+_NOT_LITERAL = object()
+
+# Only strings up to this length go through the _parse_text cache. Repeated
+# categorical values are short, while long free-text cells would rarely hit
+# and could pin a lot of memory for the life of the process
+_CACHEABLE_TEXT_LENGTH = 64
 
 
 def parse_value(value: Any) -> Optional[Union[float, str]]:
@@ -31,6 +66,40 @@ def parse_value(value: Any) -> Optional[Union[float, str]]:
     if value is None or value == "":
         return None
     
+    # Numeric cells need no string processing (bool is excluded since
+    # str(True) is not a number; NaN and infinity keep their string form)
+    value_type = type(value)
+    if value_type is int or (value_type is float and math.isfinite(value)):
+        return float(value)
+    
+    # Categorical columns repeat the same few values, so the string path is
+    # memoized; long strings and unhashable values are parsed without the cache
+    if value_type is str and len(value) > _CACHEABLE_TEXT_LENGTH:
+        return _parse_text.__wrapped__(value)
+    try:
+        return _parse_text(value)
+    except TypeError:
+        return _parse_text.__wrapped__(value)
+
+
+# typed=True keeps True apart from 1, which hash alike but parse differently
+@lru_cache(maxsize=8192, typed=True)
+def _parse_text(value: Any) -> Optional[Union[float, str]]:
+    """
+    Parse a non-numeric cell value through its string form.
+    
+    Args:
+        value: The cell value to parse (not None, "", int or finite float)
+        
+    Returns:
+        Parsed value as float, string, or None
+    """
+    # Exact-case literal hit on the raw cell text
+    if type(value) is str:
+        literal = _RAW_LITERAL_VALUES.get(value, _NOT_LITERAL)
+        if literal is not _NOT_LITERAL:
+            return literal
+    
     # Convert to string for processing
     str_value = str(value).strip()
     
@@ -38,46 +107,58 @@ def parse_value(value: Any) -> Optional[Union[float, str]]:
     if not str_value:
         return None
     
-    # Handle N/A variations (case-insensitive)
-    if str_value.upper() in ["N/A", "NA", "NULL", "NONE", "-"]:
-        return None
+    # Handle N/A variations and boolean YES/NO (case-insensitive) in one lookup
+    literal = _LITERAL_VALUES.get(str_value.upper(), _NOT_LITERAL)
+    if literal is not _NOT_LITERAL:
+        return literal
     
-    # Handle boolean YES/NO (case-insensitive)
-    if str_value.upper() == "YES":
-        return 1.0
-    if str_value.upper() == "NO":
-        return 0.0
-    
-    # Handle percentages: "45%" → 0.45
-    # Pattern matches: optional negative, digits with optional commas, optional decimal, followed by %
-    percent_match = re.match(r'^(-?[\d,]+\.?\d*)\s*%$', str_value)
-    if percent_match:
-        numeric_part = percent_match.group(1).replace(',', '')
+    # Handle numbers with commas, negative or not: "-1,234.56" → -1234.56,
+    # and percentages: "45%" → 0.45
+    number_match = _NUMBER_RE.match(str_value)
+    if number_match:
         try:
-            return float(numeric_part) / 100.0
-        except ValueError:
-            return str_value
-    
-    # Handle negative numbers with commas: "-1,234.56" → -1234.56
-    negative_match = re.match(r'^-[\d,]+\.?\d*$', str_value)
-    if negative_match:
-        try:
-            return float(str_value.replace(',', ''))
-        except ValueError:
-            return str_value
-    
-    # Handle positive numbers with commas: "1,234.56" → 1234.56
-    numeric_match = re.match(r'^[\d,]+\.?\d*$', str_value)
-    if numeric_match:
-        try:
-            return float(str_value.replace(',', ''))
+            number = float(number_match.group(1).replace(',', ''))
         except ValueError:
             return str_value
+        return number / 100.0 if number_match.group(2) else number
     
     # If no pattern matches, return as string
     return str_value
 
 
+# Clearing parse_value's cache means clearing the string-path cache
+parse_value.cache_clear = _parse_text.cache_clear
+
+
+class _FrozenHeaderMapping(HeaderMapping):
+    """HeaderMapping that rejects assignment, for instances shared process-wide"""
+    model_config = ConfigDict(frozen=True)
+
+
+@lru_cache(maxsize=1024)
+def _default_mapping(col_idx: int) -> HeaderMapping:
+    """
+    Unmatched mapping for a column beyond the header mappings.
+    
+    Built once per column index and shared by every row of every upload,
+    since each row of a wide sheet would otherwise construct an identical
+    model. The instance is frozen, so a caller that edits a cell's mapping
+    must replace it (model_copy(update=...)) rather than change the shared
+    one for later files.
+    
+    Args:
+        col_idx: Zero-based column index
+        
+    Returns:
+        HeaderMapping named Column_<col_idx> with method NONE and LOW confidence
+    """
+    return _FrozenHeaderMapping(
+        original_header=f"Column_{col_idx}",
+        method=MatchMethod.NONE,
+        confidence=ConfidenceLevel.LOW
+    )
+
+
 def parse_row(row_values: List[Any], header_mappings: List[HeaderMapping], row_index: int = 0) -> List[ParsedCell]:
     """
     Parse an entire row of values with header context.
@@ -94,11 +175,20 @@ def parse_row(row_values: List[Any], header_mappings: List[HeaderMapping], row_i
     Returns:
         List of ParsedCell objects with parsed values and audit information
         
+    Raises:
+        ValueError: If row_index is negative
+        
     Requirements:
         - 9.1: Create ParsedCell model for each processed cell
         - 9.4: Include original value and parsed value
         - 11.4: Handle parsing exceptions gracefully
     """
+    # Every cell shares row_index and column indices come from enumeration,
+    # so the index check ParsedCell's validator makes is done once here and
+    # cells are built with model_construct
+    if row_index < 0:
+        raise ValueError("row_index and column_index must be non-negative")
+    
     parsed_cells = []
     
     # Ensure we have the same number of values and mappings
@@ -110,21 +200,16 @@ def parse_row(row_values: List[Any], header_mappings: List[HeaderMapping], row_i
         value = row_values[col_idx] if col_idx < len(row_values) else None
         mapping = header_mappings[col_idx] if col_idx < len(header_mappings) else None
         
-        # If no mapping exists, create a default one
+        # If no mapping exists, use the shared default for this column
         if mapping is None:
-            from app.schema.models import MatchMethod, ConfidenceLevel
-            mapping = HeaderMapping(
-                original_header=f"Column_{col_idx}",
-                method=MatchMethod.NONE,
-                confidence=ConfidenceLevel.LOW
-            )
+            mapping = _default_mapping(col_idx)
         
         try:
             # Parse the value using the deterministic parser
             parsed = parse_value(value)
             
             # Create ParsedCell with successful parse
-            cell = ParsedCell(
+            cell = ParsedCell.model_construct(
                 row_index=row_index,
                 column_index=col_idx,
                 original_value=value,
@@ -136,7 +221,7 @@ def parse_row(row_values: List[Any], header_mappings: List[HeaderMapping], row_i
         except Exception as e:
             # Handle parsing exceptions gracefully
             # Preserve original value and record the error
-            cell = ParsedCell(
+            cell = ParsedCell.model_construct(
                 row_index=row_index,
                 column_index=col_idx,
                 original_value=value,
@@ -149,3 +234,32 @@ def parse_row(row_values: List[Any], header_mappings: List[HeaderMapping], row_i
         parsed_cells.append(cell)
     
     return parsed_cells
+
+
+def parse_sheet(
+    rows: Iterable[Sequence[Any]],
+    header_mappings: List[HeaderMapping],
+    start_row: int = 0
+) -> List[List[ParsedCell]]:
+    """
+    Parse consecutive data rows in a single pass.
+    
+    Meant to be fed straight from one iter_rows(values_only=True) call, so
+    the sheet is walked once instead of issuing one iter_rows call per row.
+    Each row is parsed exactly as parse_row would.
+    
+    Args:
+        rows: Row value sequences, top to bottom
+        header_mappings: List of HeaderMapping objects for each column
+        start_row: Row index of the first row (default: 0, should be set by caller)
+        
+    Returns:
+        One list of ParsedCell objects per row, in row order
+        
+    Raises:
+        ValueError: If start_row is negative
+    """
+    return [
+        parse_row(row_values, header_mappings, row_index=row_index)
+        for row_index, row_values in enumerate(rows, start=start_row)
+    ]
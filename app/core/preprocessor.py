@@ -6,7 +6,7 @@ heuristics and LLM fallback, and to identify merged cells and table structure.
 """
 
 import openpyxl
-from typing import Optional, List, Tuple
+from typing import Iterator, Optional, List, Tuple
 from app.schema.models import TableStructure
 from app.services.llm import LLMService
 import logging
@@ -14,6 +14,52 @@ import logging
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Header rows sit near the top of a sheet; only this many rows are scanned
+_HEADER_SCAN_ROWS = 10
+
+# A row with at least this many strings, followed by a row with at most a
+# third as many, is taken as the header without scanning further
+_STRONG_HEADER_THRESHOLD = 8
+
+# Prompt for LLM header detection; {preview} is one "Row N: (...)" line per row
+_HEADER_PROMPT_TEMPLATE = """Given these Excel rows, which row number contains the column headers?
+
+{preview}
+
+Return only the row number as an integer."""
+
+
+def _is_nonblank_str(value) -> bool:
+    """Return True if value is a string with at least one non-whitespace character.
+    
+    isspace() is False for the empty string, so the empty check comes first;
+    unlike strip() this allocates nothing.
+    """
+    return isinstance(value, str) and bool(value) and not value.isspace()
+
+
+def _iter_rows_isolated(
+    sheet: openpyxl.worksheet.worksheet.Worksheet,
+    max_row: int
+) -> Iterator[Tuple[int, Tuple]]:
+    """
+    Yield (row_idx, values) for rows 1..max_row in one values-only pass.
+    
+    A generator that raises is finished, so a row whose read fails would end
+    a plain iter_rows loop. Instead the failure is logged and the pass
+    resumes at the next row, so one corrupted row doesn't stop detection.
+    """
+    row_idx = 1
+    while row_idx <= max_row:
+        try:
+            for row in sheet.iter_rows(min_row=row_idx, max_row=max_row, values_only=True):
+                yield row_idx, row
+                row_idx += 1
+            return
+        except Exception as e:
+            logger.warning(f"Error reading row {row_idx}: {e}")
+            row_idx += 1
+
 
 def find_header_row(
     sheet: openpyxl.worksheet.worksheet.Worksheet, 
@@ -24,6 +70,8 @@ def find_header_row(
     
     Heuristic: Row with >3 string values is likely a header.
     If multiple candidates exist, selects the row with the most string cells.
+    The scan covers the first 10 rows and stops early once a row with 8 or
+    more strings is followed by a row with at most a third as many.
     If ambiguous and LLM service is available, uses LLM for detection.
     
     Args:
@@ -42,24 +90,39 @@ def find_header_row(
     if sheet is None:
         raise ValueError("Sheet cannot be None")
     
-    if sheet.max_row < 1 or sheet.max_column < 1:
-        raise ValueError(f"Sheet has no data: {sheet.max_row} rows, {sheet.max_column} columns")
+    # Read-only worksheets report None dimensions when the file carries no
+    # dimension record; the scan below is values-only, so it works on them
+    max_row = sheet.max_row
+    max_column = sheet.max_column
+    if (max_row is not None and max_row < 1) or (max_column is not None and max_column < 1):
+        raise ValueError(f"Sheet has no data: {max_row} rows, {max_column} columns")
     
     try:
-        max_row_to_check = min(10, sheet.max_row)
+        max_row_to_check = _HEADER_SCAN_ROWS if max_row is None else min(_HEADER_SCAN_ROWS, max_row)
         candidate_rows: List[Tuple[int, int, Tuple]] = []
+        previous_count = 0
+        widest_row = 0
         
-        # Heuristic: Count string cells per row
-        for row_idx in range(1, max_row_to_check + 1):
+        # Read the scanned rows in one values-only pass instead of one
+        # iter_rows call per row; values_only skips building Cell wrappers.
+        # Heuristic: Count string cells per row; unreadable rows are skipped
+        for row_idx, row in _iter_rows_isolated(sheet, max_row_to_check):
             try:
-                row = list(sheet.iter_rows(min_row=row_idx, max_row=row_idx, values_only=True))[0]
-                string_count = sum(1 for cell in row if isinstance(cell, str) and cell.strip())
+                widest_row = max(widest_row, len(row))
+                string_count = sum(1 for cell in row if _is_nonblank_str(cell))
+                
+                # A strong header followed by a sharp drop (data rows) settles it
+                if previous_count >= _STRONG_HEADER_THRESHOLD and string_count <= previous_count // 3:
+                    logger.debug(f"Row {row_idx - 1} is a strong header, stopping scan")
+                    break
+                previous_count = string_count
                 
                 if string_count > 3:
                     candidate_rows.append((row_idx, string_count, row))
                     logger.debug(f"Row {row_idx} has {string_count} string cells - candidate header")
             except Exception as e:
                 logger.warning(f"Error processing row {row_idx}: {e}")
+                previous_count = 0
                 continue
         
         # Determine header row index
@@ -86,20 +149,32 @@ def find_header_row(
                 logger.warning("No clear candidates and no LLM service, defaulting to row 1")
                 header_row_idx = 1
         
-        # Detect merged cells
+        if max_column is None:
+            # Unsized read-only sheet: take the width from the scanned rows
+            if widest_row < 1:
+                raise ValueError("Sheet has no data: no cells in the scanned rows")
+            max_column = widest_row
+        
+        # Detect merged cells straight from the sheet's merged ranges; no
+        # cells are visited. Read-only worksheets do not load merge records.
         merged_cells = []
-        try:
-            for merged_range in sheet.merged_cells.ranges:
-                merged_cells.append({
-                    "min_row": merged_range.min_row,
-                    "max_row": merged_range.max_row,
-                    "min_col": merged_range.min_col,
-                    "max_col": merged_range.max_col
-                })
-            logger.info(f"Detected {len(merged_cells)} merged cell ranges")
-        except Exception as e:
-            logger.warning(f"Error detecting merged cells: {e}")
-            # Continue without merged cell information
+        if not hasattr(sheet, "merged_cells"):
+            logger.info("Read-only worksheet, merged cell ranges are not available")
+        else:
+            try:
+                merged_cells = [
+                    {
+                        "min_row": merged_range.min_row,
+                        "max_row": merged_range.max_row,
+                        "min_col": merged_range.min_col,
+                        "max_col": merged_range.max_col
+                    }
+                    for merged_range in sheet.merged_cells.ranges
+                ]
+                logger.info(f"Detected {len(merged_cells)} merged cell ranges")
+            except Exception as e:
+                logger.warning(f"Error detecting merged cells: {e}")
+                # Continue without merged cell information
         
         # Calculate data start row (header row + 1)
         data_start_row = header_row_idx + 1
@@ -107,12 +182,12 @@ def find_header_row(
         table_structure = TableStructure(
             header_row_index=header_row_idx,
             data_start_row=data_start_row,
-            column_count=sheet.max_column,
+            column_count=max_column,
             merged_cells=merged_cells
         )
         
         logger.info(f"Table structure detected: header at row {header_row_idx}, "
-                    f"data starts at row {data_start_row}, {sheet.max_column} columns")
+                    f"data starts at row {data_start_row}, {max_column} columns")
         
         return table_structure
         
@@ -144,23 +219,16 @@ def _llm_detect_header_row(
         ValueError: If LLM detection fails completely
     """
     try:
-        rows_text = []
-        for row_idx in range(1, max_rows + 1):
-            try:
-                row = list(sheet.iter_rows(min_row=row_idx, max_row=row_idx, values_only=True))[0]
-                rows_text.append(f"Row {row_idx}: {row}")
-            except Exception as e:
-                logger.warning(f"Error reading row {row_idx} for LLM detection: {e}")
-                continue
+        # Same single values-only pass as the heuristic scan
+        rows_text = [
+            f"Row {row_idx}: {row}"
+            for row_idx, row in _iter_rows_isolated(sheet, max_rows)
+        ]
         
         if not rows_text:
             raise ValueError("No rows could be read for LLM detection")
         
-        prompt = f"""Given these Excel rows, which row number contains the column headers?
-
-{chr(10).join(rows_text)}
-
-Return only the row number as an integer."""
+        prompt = _HEADER_PROMPT_TEMPLATE.format(preview="\n".join(rows_text))
         
         logger.info("Querying LLM for header row detection")
         response = llm_service.simple_query(prompt)
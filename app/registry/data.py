@@ -10,10 +10,77 @@ This module provides the RegistryManager class which maintains:
 Requirements: 2.1, 2.2, 2.3, 2.5, 15.3
 """
 
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
 import re
 
 
+# ASCII bytes stripped during normalization: everything except a-z and 0-9.
+# Non-ASCII characters are dropped by the ascii encode before the translate.
+_NON_ALNUM_BYTES = bytes(
+    c for c in range(128) if not (ord('a') <= c <= ord('z') or ord('0') <= c <= ord('9'))
+)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_text(text: str) -> str:
+    """
+    Cached normalization shared by all RegistryManager instances.
+    
+    Headers repeat heavily across files and across tiers (Tier 1 lookup,
+    Tier 2 parameter inference, audit trail), so each distinct string is
+    only lowered and stripped once.
+    """
+    # Equivalent to re.sub(r'[^a-z0-9]', '', text.lower()), but both the
+    # encode and the delete-only translate are single C loops
+    return text.lower().encode('ascii', 'ignore').translate(None, _NON_ALNUM_BYTES).decode('ascii')
+
+
+# Asset identifiers with regex patterns
+# Patterns match variations like "AFBC-1", "AFBC_1", "AFBC1"
+_ASSET_PATTERNS: Dict[str, str] = {
+    "AFBC": r"AFBC[-_]?\d+",
+    "TG": r"TG[-_]?\d+",
+    "ESP": r"ESP[-_]?\d+",
+    "APH": r"APH[-_]?\d+",
+    "FD_FAN": r"FD[-_]?FAN[-_]?\d+",
+    "ID_FAN": r"ID[-_]?FAN[-_]?\d+",
+    "PA_FAN": r"PA[-_]?FAN[-_]?\d+",
+    "BOILER": r"BOILER[-_]?\d+",
+    "TURBINE": r"TURBINE[-_]?\d+",
+    "GENERATOR": r"GENERATOR[-_]?\d+",
+    "CONDENSER": r"CONDENSER[-_]?\d+",
+    "ECONOMIZER": r"ECONOMIZER[-_]?\d+",
+}
+
+# Single alternation over every asset pattern, one named group per asset
+# type, so extraction is one regex scan instead of one per type
+_ASSET_RE: re.Pattern = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in _ASSET_PATTERNS.items()),
+    re.IGNORECASE,
+)
+
+
+class Asset(NamedTuple):
+    """Asset extracted from a header: its registry type and the identifier as written."""
+    asset_type: str
+    asset_id: str
+
+
+@lru_cache(maxsize=4096)
+def _search_asset(header: str) -> Optional[Asset]:
+    """
+    Cached asset extraction shared by all RegistryManager instances.
+    
+    The same header is searched by Tier 2 and again for every file that
+    repeats it; the result tuple is immutable, so it is safe to share.
+    """
+    match = _ASSET_RE.search(header)
+    if match:
+        return Asset(match.lastgroup, match.group(0))
+    return None
+
+
 class RegistryManager:
     """
     Manages standardized parameters and assets with efficient lookup.
@@ -49,35 +116,17 @@ class RegistryManager:
             "Thermal_Efficiency",
         ]
         
-        # Asset identifiers with regex patterns
-        # Patterns match variations like "AFBC-1", "AFBC_1", "AFBC1"
-        self.assets: Dict[str, str] = {
-            "AFBC": r"AFBC[-_]?\d+",
-            "TG": r"TG[-_]?\d+",
-            "ESP": r"ESP[-_]?\d+",
-            "APH": r"APH[-_]?\d+",
-            "FD_FAN": r"FD[-_]?FAN[-_]?\d+",
-            "ID_FAN": r"ID[-_]?FAN[-_]?\d+",
-            "PA_FAN": r"PA[-_]?FAN[-_]?\d+",
-            "BOILER": r"BOILER[-_]?\d+",
-            "TURBINE": r"TURBINE[-_]?\d+",
-            "GENERATOR": r"GENERATOR[-_]?\d+",
-            "CONDENSER": r"CONDENSER[-_]?\d+",
-            "ECONOMIZER": r"ECONOMIZER[-_]?\d+",
-        }
+        # Asset identifiers with regex patterns. Listed for the LLM prompt;
+        # extract_asset always uses the fixed module patterns, so changing
+        # this dict does not change extraction
+        self.assets: Dict[str, str] = dict(_ASSET_PATTERNS)
         
         # Normalized lookup for O(1) exact matching
         # Maps normalized strings to original parameter names
         self.normalized_params: Dict[str, str] = {
             self._normalize(p): p for p in self.parameters
         }
-        
-        # Compiled regex patterns for Tier 2 matching
-        # Pre-compilation improves performance for repeated matching
-        self.asset_patterns: Dict[str, re.Pattern] = {
-            name: re.compile(pattern, re.IGNORECASE)
-            for name, pattern in self.assets.items()
-        }
+        self._parameter_names = frozenset(self.parameters)
     
     def _normalize(self, text: str) -> str:
         """
@@ -99,7 +148,7 @@ class RegistryManager:
         Returns:
             Normalized string with only lowercase alphanumeric characters
         """
-        return re.sub(r'[^a-z0-9]', '', text.lower())
+        return _normalize_text(text)
     
     def exact_match(self, header: str) -> Optional[str]:
         """
@@ -121,21 +170,26 @@ class RegistryManager:
             exact_match("POWER-OUTPUT") -> "Power_Output"
             exact_match("Unknown Header") -> None
         """
+        # Headers already spelled exactly as a registry name skip normalization
+        if header in self._parameter_names:
+            return header
         normalized = self._normalize(header)
         return self.normalized_params.get(normalized)
     
-    def extract_asset(self, header: str) -> Optional[Tuple[str, str]]:
+    def extract_asset(self, header: str) -> Optional[Asset]:
         """
         Extract asset identifier using compiled regex patterns.
         
-        Searches the header string for any known asset patterns.
-        Returns the first match found, along with the asset type.
+        Searches the header string for all known asset patterns in a single
+        pass. Returns the leftmost match found, along with the asset type.
+        The patterns are the fixed module-level ones; edits to self.assets
+        do not affect extraction.
         
         Args:
             header: Excel column header potentially containing an asset identifier
             
         Returns:
-            Tuple of (asset_type, asset_identifier) if found, None otherwise
+            Asset (asset_type, asset_id) named tuple if found, None otherwise
             
         Examples:
             extract_asset("Power TG1") -> ("TG", "TG1")
@@ -144,8 +198,20 @@ class RegistryManager:
             extract_asset("ESP-1") -> ("ESP", "ESP-1")
             extract_asset("Temperature") -> None
         """
-        for asset_type, pattern in self.asset_patterns.items():
-            match = pattern.search(header)
-            if match:
-                return (asset_type, match.group(0))
-        return None
+        return _search_asset(header)
+    
+    def extract_asset_many(self, headers: List[str]) -> List[Optional[Asset]]:
+        """
+        Extract asset identifiers for a batch of headers.
+        
+        Equivalent to calling extract_asset on each header, without the
+        per-header method dispatch.
+        
+        Args:
+            headers: Excel column headers potentially containing asset identifiers
+            
+        Returns:
+            List with an Asset or None per header, in input order
+        """
+        search = _search_asset
+        return [search(header) for header in headers]
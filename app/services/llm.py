@@ -8,26 +8,190 @@ error handling with retry logic.
 """
 
 import google.generativeai as genai
-from typing import List, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import hashlib
+import json
 import logging
+import random
+import re
+import threading
 import time
 from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
-from pydantic import TypeAdapter
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Response schema for batch matching. Gemini decodes against it, so the
+# output is always a well-formed array of mapping objects and the repair
+# pass below is only a safety net. Written out by hand because the SDK
+# rejects the "default" keys that Pydantic's generated schema carries.
+_NULLABLE_STRING = {"type": "string", "nullable": True}
+_MAPPINGS_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "original_header": {"type": "string"},
+            "matched_parameter": _NULLABLE_STRING,
+            "matched_asset": _NULLABLE_STRING,
+            "method": {"type": "string", "enum": [MatchMethod.LLM.value]},
+            "confidence": {"type": "string", "enum": [level.value for level in ConfidenceLevel]},
+            "normalized_header": _NULLABLE_STRING,
+        },
+        "required": ["original_header", "method", "confidence"],
+    },
+}
+
+# Confidence strings to enum members; a dict lookup is much cheaper than
+# calling ConfidenceLevel(value) once per mapping
+_CONFIDENCE_LEVELS = {level.value: level for level in ConfidenceLevel}
+
+# Repairs for common near-miss LLM output: markdown code fences around the
+# array and trailing commas before a closing bracket or brace
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[\]}])')
+
+
+class ApiCallCount:
+    """Number of Gemini requests made inside a count_api_calls block"""
+    
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+    
+    def increment(self) -> None:
+        with self._lock:
+            self.value += 1
+
+
+# The count bound by the innermost count_api_calls block, if any. A context
+# variable rather than service state, because the service is shared by
+# concurrent uploads and each upload needs its own tally.
+_current_api_call_count: ContextVar[Optional[ApiCallCount]] = ContextVar(
+    "_current_api_call_count", default=None
+)
+
+
+@contextmanager
+def count_api_calls():
+    """
+    Count the Gemini requests made in this context.
+    
+    Only requests actually sent to the API are counted; answers served from
+    the response caches and calls skipped by the open circuit breaker are
+    not. Retries of one request count once.
+    
+    Yields:
+        ApiCallCount whose value is the number of requests so far
+    """
+    count = ApiCallCount()
+    token = _current_api_call_count.set(count)
+    try:
+        yield count
+    finally:
+        _current_api_call_count.reset(token)
+
+
+def _non_empty_or_none(value) -> Optional[str]:
+    """Return value if it is a non-blank string, otherwise None."""
+    if isinstance(value, str) and value.strip():
+        return value
+    return None
+
+
+def _repair_json(text: str) -> Optional[str]:
+    """
+    Best-effort repair of a malformed JSON array returned by the LLM.
+    
+    Only runs after strict parsing has failed, so well-formed responses
+    never pay for it.
+    
+    Args:
+        text: Raw response text
+        
+    Returns:
+        Repaired text, or None if no JSON array can be located
+    """
+    text = _CODE_FENCE_RE.sub('', text)
+    start = text.find('[')
+    end = text.rfind(']')
+    if start == -1 or end < start:
+        return None
+    return _TRAILING_COMMA_RE.sub(r'\1', text[start:end + 1])
+
+
+@lru_cache(maxsize=8)
+def _registry_prompt_prefix(parameters: Tuple[str, ...], assets: Tuple[str, ...]) -> str:
+    """
+    Build the header-independent opening of the batch matching prompt.
+    
+    Everything that does not depend on the headers comes first, with the
+    registry lists in canonical order, so consecutive batches share a
+    byte-identical prefix that Gemini's implicit prefix caching can reuse.
+    
+    Args:
+        parameters: Registry parameters
+        assets: Registry asset types
+        
+    Returns:
+        Prompt text up to (not including) the UNMAPPED HEADERS section
+    """
+    return f"""You are mapping Excel column headers to a standardized registry.
+
+REGISTRY PARAMETERS:
+{', '.join(sorted(parameters))}
+
+REGISTRY ASSETS:
+{', '.join(sorted(assets))}
+
+For each header, determine:
+1. The best matching parameter (or null if none)
+2. The best matching asset (or null if none)
+3. Confidence level: high, medium, or low
+
+Return a JSON array of mappings with the following structure:
+[
+  {{
+    "original_header": "header text",
+    "matched_parameter": "parameter name or null",
+    "matched_asset": "asset name or null",
+    "method": "llm",
+    "confidence": "high|medium|low",
+    "normalized_header": null
+  }}
+]
+
+"""
+
 
 class LLMService:
     """Handles all LLM interactions using Gemini 1.5 Flash"""
     
-    def __init__(self, api_key: str, max_retries: int = 3):
+    def __init__(
+        self,
+        api_key: str,
+        max_retries: int = 3,
+        cache_size: int = 128,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0
+    ):
         """
         Initialize the LLM service with Gemini API.
         
         Args:
             api_key: Google Gemini API key
             max_retries: Maximum number of retry attempts for API calls
+            cache_size: Number of batch responses, and of simple query
+                responses, kept in the in-process LRU caches (0 disables
+                caching)
+            breaker_threshold: Consecutive failed calls (after all retries)
+                that open the circuit breaker
+            breaker_cooldown: Seconds the breaker stays open before calls
+                are attempted again
         """
         if not api_key:
             raise ValueError("API key cannot be empty")
@@ -36,6 +200,37 @@ class LLMService:
         # Use gemini-flash-latest for best performance and compatibility
         self.model = genai.GenerativeModel('gemini-flash-latest')
         self.max_retries = max_retries
+        
+        # Built once and reused for every structured call
+        self._structured_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=_MAPPINGS_RESPONSE_SCHEMA
+        )
+        
+        # batch_match_headers is deterministic in its inputs, so repeated
+        # batches (re-uploads, duplicate sheets) are answered from memory
+        # instead of another Gemini round-trip
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[HeaderMapping]]" = OrderedDict()
+        # simple_query answers keyed by prompt digest; sheets built from the
+        # same template send header detection the same preview rows
+        self._query_cache: "OrderedDict[str, str]" = OrderedDict()
+        # Tier 3 may call batch_match_headers from several threads at once
+        self._cache_lock = threading.Lock()
+        
+        # Circuit breaker: after breaker_threshold calls in a row exhaust
+        # their retries, further calls fail fast until the cooldown elapses
+        # instead of each spending the full backoff schedule on an outage
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+        # Tier 3 workers and concurrent uploads share the breaker, so its
+        # state and the call total are only read and written under this lock
+        self._breaker_lock = threading.Lock()
+        
+        # Requests actually sent to Gemini over the service's lifetime
+        self.api_calls_made = 0
         logger.info("LLMService initialized with Gemini Flash")
     
     def batch_match_headers(
@@ -60,6 +255,15 @@ class LLMService:
             logger.warning("batch_match_headers called with empty headers list")
             return []
         
+        cache_key = self._cache_key(headers, parameters, assets)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {len(cached)} cached LLM mappings")
+            return [mapping.model_copy() for mapping in cached]
+        
         logger.info(f"Batch matching {len(headers)} headers via LLM")
         
         # Construct prompt
@@ -84,8 +288,12 @@ class LLMService:
         
         # Parse response using Pydantic
         try:
-            mappings = self._parse_llm_response(response_text, headers)
+            mappings, complete = self._parse_llm_response(response_text, headers)
             logger.info(f"Successfully parsed {len(mappings)} mappings from LLM")
+            if complete:
+                # A short or long response is not cached; the NONE padding
+                # for unanswered headers would otherwise never be retried
+                self._cache_store(cache_key, mappings)
             return mappings
         except Exception as e:
             logger.error(f"Failed to parse LLM response: {e}")
@@ -105,12 +313,24 @@ class LLMService:
         """
         Simple text query for header row detection.
         
+        Non-empty answers are cached by a digest of the prompt, so a
+        repeated preview is not sent to the LLM again.
+        
         Args:
             prompt: The query prompt
             
         Returns:
             Text response from the LLM
         """
+        cache_key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+        with self._cache_lock:
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                self._query_cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.info("Returning cached simple query response")
+            return cached
+        
         logger.info("Executing simple LLM query")
         
         response_text = self._call_llm_with_retry(prompt, use_structured_output=False)
@@ -119,8 +339,65 @@ class LLMService:
             logger.error("Simple query failed after all retries")
             return ""
         
+        if response_text:
+            self._store_lru(self._query_cache, cache_key, response_text)
         return response_text
     
+    @staticmethod
+    def _cache_key(
+        headers: List[str],
+        parameters: List[str],
+        assets: List[str]
+    ) -> str:
+        """
+        Build the response cache key for a batch.
+        
+        Header order is kept because mappings are returned in input order;
+        the registry lists are sorted since their order does not change
+        the answer.
+        
+        Args:
+            headers: List of unmapped headers
+            parameters: List of registry parameters
+            assets: List of registry asset types
+            
+        Returns:
+            SHA-256 hex digest of the canonical inputs
+        """
+        payload = json.dumps([headers, sorted(parameters), sorted(assets)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _cache_store(self, cache_key: str, mappings: List[HeaderMapping]) -> None:
+        """
+        Store successfully parsed mappings, evicting the least recently used.
+        
+        Fallback (unmapped) results are never stored, so a transient API
+        failure is retried on the next call.
+        
+        Args:
+            cache_key: Key from _cache_key
+            mappings: Parsed mappings for the batch
+        """
+        self._store_lru(self._cache, cache_key, [mapping.model_copy() for mapping in mappings])
+    
+    def _store_lru(self, cache: OrderedDict, cache_key: str, value) -> None:
+        """
+        Store a value in one of the response caches, evicting the least
+        recently used entries beyond cache_size.
+        
+        Args:
+            cache: The OrderedDict cache to store into
+            cache_key: Key for the entry
+            value: Value to store
+        """
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            cache[cache_key] = value
+            cache.move_to_end(cache_key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+    
     def _build_batch_match_prompt(
         self, 
         headers: List[str], 
@@ -138,37 +415,16 @@ class LLMService:
         Returns:
             Formatted prompt string
         """
-        prompt = f"""You are mapping Excel column headers to a standardized registry.
-
-REGISTRY PARAMETERS:
-{', '.join(parameters)}
-
-REGISTRY ASSETS:
-{', '.join(assets)}
-
-UNMAPPED HEADERS:
-{chr(10).join(f"{i+1}. {h}" for i, h in enumerate(headers))}
-
-For each header, determine:
-1. The best matching parameter (or null if none)
-2. The best matching asset (or null if none)
-3. Confidence level: high, medium, or low
-
-Return a JSON array of mappings with the following structure:
-[
-  {{
-    "original_header": "header text",
-    "matched_parameter": "parameter name or null",
-    "matched_asset": "asset name or null",
-    "method": "llm",
-    "confidence": "high|medium|low",
-    "normalized_header": null
-  }}
-]
-
-Ensure the array has exactly {len(headers)} mappings in the same order as the input headers."""
+        # The registry block is identical for every batch against the same
+        # registry, so it is built once and cached; only the header list and
+        # count are formatted per call
+        prefix = _registry_prompt_prefix(tuple(parameters), tuple(assets))
+        header_lines = "\n".join(f"{i+1}. {h}" for i, h in enumerate(headers))
         
-        return prompt
+        return (
+            f"{prefix}UNMAPPED HEADERS:\n{header_lines}\n\n"
+            f"Ensure the array has exactly {len(headers)} mappings in the same order as the input headers."
+        )
     
     def _call_llm_with_retry(
         self, 
@@ -176,49 +432,77 @@ Ensure the array has exactly {len(headers)} mappings in the same order as the in
         use_structured_output: bool = True
     ) -> Optional[str]:
         """
-        Call LLM with exponential backoff retry logic.
+        Call LLM with jittered exponential backoff and a circuit breaker.
+        
+        Each retry sleeps a random time between 0 and 2**attempt seconds
+        ("full jitter"), so concurrent callers hitting the same outage do not
+        retry in lockstep. While the breaker is open the call returns None
+        immediately without contacting the API.
         
         Args:
             prompt: The prompt to send
             use_structured_output: Whether to use structured JSON output
             
         Returns:
-            Response text or None if all retries failed
+            Response text or None if all retries failed or the breaker is open
         """
+        with self._breaker_lock:
+            breaker_open = time.monotonic() < self._breaker_open_until
+            if not breaker_open:
+                self.api_calls_made += 1
+        if breaker_open:
+            logger.warning("LLM circuit breaker open, skipping API call")
+            return None
+        
+        call_count = _current_api_call_count.get()
+        if call_count is not None:
+            call_count.increment()
+        
         for attempt in range(self.max_retries):
             try:
                 if use_structured_output:
-                    # Use structured output for batch matching
+                    # Schema-constrained JSON output for batch matching
                     response = self.model.generate_content(
                         prompt,
-                        generation_config=genai.GenerationConfig(
-                            response_mime_type="application/json"
-                        )
+                        generation_config=self._structured_config
                     )
                 else:
                     # Simple text response
                     response = self.model.generate_content(prompt)
                 
+                with self._breaker_lock:
+                    self._consecutive_failures = 0
                 return response.text
                 
             except Exception as e:
                 logger.warning(f"LLM API call attempt {attempt + 1} failed: {e}")
                 
                 if attempt < self.max_retries - 1:
-                    # Exponential backoff: 1s, 2s, 4s
-                    sleep_time = 2 ** attempt
-                    logger.info(f"Retrying in {sleep_time} seconds...")
+                    # Full-jitter exponential backoff: up to 1s, 2s, 4s
+                    sleep_time = random.uniform(0, 2 ** attempt)
+                    logger.info(f"Retrying in {sleep_time:.2f} seconds...")
                     time.sleep(sleep_time)
                 else:
                     logger.error(f"All {self.max_retries} retry attempts failed")
         
+        with self._breaker_lock:
+            self._consecutive_failures += 1
+            failures = self._consecutive_failures
+            if failures >= self.breaker_threshold:
+                self._breaker_open_until = time.monotonic() + self.breaker_cooldown
+        if failures >= self.breaker_threshold:
+            logger.error(
+                f"{failures} consecutive LLM failures, "
+                f"opening circuit breaker for {self.breaker_cooldown} seconds"
+            )
+        
         return None
     
     def _parse_llm_response(
         self, 
         response_text: str, 
         original_headers: List[str]
-    ) -> List[HeaderMapping]:
+    ) -> Tuple[List[HeaderMapping], bool]:
         """
         Parse LLM JSON response into HeaderMapping objects.
         
@@ -227,37 +511,58 @@ Ensure the array has exactly {len(headers)} mappings in the same order as the in
             original_headers: Original headers for validation
             
         Returns:
-            List of HeaderMapping objects
+            Tuple of (HeaderMapping objects, one per header; whether the
+            response had exactly one mapping per header, so nothing was
+            padded as unmapped or dropped)
         """
-        # Use Pydantic TypeAdapter for parsing
-        adapter = TypeAdapter(List[HeaderMapping])
-        mappings = adapter.validate_json(response_text)
+        try:
+            data = json.loads(response_text)
+        except json.JSONDecodeError:
+            # Retry once on a repaired copy before giving up on the batch;
+            # a second failure propagates and the caller maps every header
+            # to NONE
+            repaired = _repair_json(response_text)
+            if repaired is None:
+                raise
+            logger.warning("LLM response was not valid JSON, parsing repaired response")
+            data = json.loads(repaired)
         
-        # Ensure method is set to LLM and validate
-        for i, mapping in enumerate(mappings):
-            mapping.method = MatchMethod.LLM
-            
-            # Set default confidence if not provided
-            if mapping.confidence is None:
-                mapping.confidence = ConfidenceLevel.MEDIUM
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ValueError("LLM response is not a JSON array of mapping objects")
+        
+        if len(data) > len(original_headers):
+            logger.warning("LLM returned more mappings than headers")
+        elif len(data) < len(original_headers):
+            logger.warning(f"LLM returned {len(data)} mappings but expected {len(original_headers)}")
+        
+        # The response_schema already fixes the shape, so mappings are built
+        # with model_construct instead of running every field validator; the
+        # checks the validators would make are applied inline below.
+        # Headers the LLM did not answer stay unmapped.
+        mappings: List[HeaderMapping] = [None] * len(original_headers)
+        for i, item in enumerate(data[:len(original_headers)]):
+            original_header = item.get("original_header")
+            if not isinstance(original_header, str) or not original_header.strip():
+                original_header = original_headers[i]
             
-            # Validate that we have the right number of mappings
-            if i >= len(original_headers):
-                logger.warning(f"LLM returned more mappings than headers")
-                break
-        
-        # If LLM returned fewer mappings than headers, fill in the rest
-        if len(mappings) < len(original_headers):
-            logger.warning(f"LLM returned {len(mappings)} mappings but expected {len(original_headers)}")
-            for i in range(len(mappings), len(original_headers)):
-                mappings.append(
-                    HeaderMapping(
-                        original_header=original_headers[i],
-                        matched_parameter=None,
-                        matched_asset=None,
-                        method=MatchMethod.NONE,
-                        confidence=ConfidenceLevel.LOW
-                    )
-                )
+            mappings[i] = HeaderMapping.model_construct(
+                original_header=original_header,
+                matched_parameter=_non_empty_or_none(item.get("matched_parameter")),
+                matched_asset=_non_empty_or_none(item.get("matched_asset")),
+                method=MatchMethod.LLM,
+                # Missing confidence defaults to MEDIUM; an unknown value
+                # raises KeyError and fails the batch like any other bad response
+                confidence=_CONFIDENCE_LEVELS[item.get("confidence") or ConfidenceLevel.MEDIUM.value],
+                normalized_header=_non_empty_or_none(item.get("normalized_header"))
+            )
+        
+        for i in range(len(data), len(original_headers)):
+            mappings[i] = HeaderMapping(
+                original_header=original_headers[i],
+                matched_parameter=None,
+                matched_asset=None,
+                method=MatchMethod.NONE,
+                confidence=ConfidenceLevel.LOW
+            )
         
-        return mappings[:len(original_headers)]  # Ensure we don't return more than requested
+        return mappings, len(data) == len(original_headers)
@@ -0,0 +1,46 @@
+"""
+Shared pytest configuration and fixtures.
+
+Registers Hypothesis settings profiles. The "ci" profile (the default) skips
+the on-disk example database and derandomizes generation, since nothing is
+persisted between CI runs; set HYPOTHESIS_PROFILE=dev to keep the database
+and random seeds while iterating locally.
+"""
+
+import os
+
+import pytest
+from hypothesis import settings
+
+
+settings.register_profile("ci", database=None, derandomize=True)
+settings.register_profile("dev")
+settings.load_profile(os.getenv("HYPOTHESIS_PROFILE", "ci"))
+
+
+@pytest.fixture(scope="session")
+def registry():
+    """
+    RegistryManager shared by the whole session.
+    
+    No test mutates the registry; a test that needs to should construct
+    its own RegistryManager instead of using this fixture.
+    """
+    from app.registry.data import RegistryManager
+    
+    return RegistryManager()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Test client for the FastAPI app, shared by every API test in the session.
+    
+    The app is imported here rather than at module level so that test files
+    which never touch the API don't pay for importing it.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+    
+    with TestClient(app) as test_client:
+        yield test_client
@@ -4,244 +4,204 @@ Property-based tests for the deterministic value parser.
 Feature: latspace-excel-parser
 """
 
-import re
 import pytest
-from hypothesis import given, strategies as st
+from hypothesis import given, settings, strategies as st, HealthCheck, Phase
 from app.core.parser import parse_value
 
 
-# Property 6: Numeric Value Parsing with Commas
-# **Validates: Requirements 8.1**
+# Strategies shared across tests, built once at import. Unparseable and
+# alphanumeric inputs are constructed rather than filtered, so no draw is
+# ever rejected.
+_WHITESPACE = st.text(alphabet=' \t', max_size=3)
+
+# Any text followed by a letter suffix can never be empty, N/A, YES/NO,
+# a number, or a percentage
+_UNPARSEABLE_TEXT = st.text(
+    alphabet=st.characters(blacklist_categories=('Cs',)),  # Exclude surrogates
+    max_size=40,
+).map(lambda s: s + "_XYZUNPARSE")
+
+# At least one letter and one digit, in any order; the digit also rules out
+# the N/A and YES/NO special values
+_ALPHANUMERIC_TEXT = st.tuples(
+    st.characters(whitelist_categories=('Lu', 'Ll')),
+    st.characters(whitelist_categories=('Nd',)),
+    st.lists(st.characters(whitelist_categories=('Lu', 'Ll', 'Nd')), max_size=18),
+).flatmap(
+    lambda parts: st.permutations([parts[0], parts[1], *parts[2]])
+).map(''.join)
+
+
+# parse_value is deterministic on short strings, so skip the shrink phase
+# and deadline timing; the example database and derandomization come from
+# the profile loaded in conftest.py
+_FAST = settings(
+    max_examples=25,
+    deadline=None,
+    phases=(Phase.generate, Phase.target),
+    suppress_health_check=[HealthCheck.too_slow],
+)
 
+# Reduced smoke tests that accompany each batch sweep; the batches carry the
+# bulk of the coverage
+_SMOKE = settings(_FAST, max_examples=10)
 
-@given(
-    # Generate floats with reasonable precision
-    value=st.floats(
-        min_value=1000.0,
-        max_value=999999999.99,
-        allow_nan=False,
-        allow_infinity=False,
-    ),
-)
-def test_numeric_parsing_with_commas(value):
-    """
-    Property 6: Numeric Value Parsing with Commas
-    For any string representing a number with comma separators (e.g., "1,234.56", "10,000"),
-    parsing should remove commas and return the correct numeric value.
-    
-    **Validates: Requirements 8.1**
-    """
-    # Format the value with commas
-    # Use Python's format to add commas
-    formatted_str = f"{value:,.2f}" if value % 1 != 0 else f"{int(value):,}"
-    
-    # Parse the formatted string
-    result = parse_value(formatted_str)
-    
-    # Verify the result matches the expected value (with small tolerance for float precision)
-    assert result is not None, f"parse_value returned None for '{formatted_str}'"
-    assert isinstance(result, float), f"parse_value did not return float for '{formatted_str}'"
-    
-    # For integers, expect exact match
-    if value % 1 == 0:
-        expected = float(int(value))
-        assert result == expected, \
-            f"parse_value({formatted_str}) = {result}, expected {expected}"
-    else:
-        # For decimals, allow small tolerance due to float formatting
-        expected = round(value, 2)
-        assert abs(result - expected) < 1e-6, \
-            f"parse_value({formatted_str}) = {result}, expected {expected}"
 
+def _linspace(start: float, stop: float, num: int) -> list:
+    """Evenly spaced floats over [start, stop], endpoints included."""
+    step = (stop - start) / (num - 1)
+    return [start + i * step for i in range(num)]
 
-@given(
-    # Generate positive integers with commas
-    value=st.integers(min_value=1000, max_value=999999999),
-)
-def test_numeric_parsing_integer_with_commas(value):
-    """
-    Property 6: Numeric Value Parsing with Commas (Integer variant)
-    For any integer string with comma separators, parsing should return the correct numeric value.
-    
-    **Validates: Requirements 8.1**
-    """
-    # Format with commas
-    formatted_str = f"{value:,}"
-    expected_value = float(value)
-    
-    # Parse the formatted string
-    result = parse_value(formatted_str)
-    
-    # Verify the result
-    assert result == expected_value, \
-        f"parse_value({formatted_str}) = {result}, expected {expected_value}"
 
+def _format_percentage(percentage: float) -> str:
+    """Format a float as a percentage string to six significant digits.
 
-@given(
-    # Generate negative integers with commas
-    value=st.integers(min_value=-999999999, max_value=-1000),
-)
-def test_numeric_parsing_negative_with_commas(value):
-    """
-    Property 6: Numeric Value Parsing with Commas (Negative variant)
-    For any negative number string with comma separators, parsing should return the correct numeric value.
-    
-    **Validates: Requirements 8.1**
+    Inputs are kept >= 0.001, so the 'g' format never switches to scientific
+    notation.
     """
-    # Format with commas (Python's format adds commas after the negative sign)
-    formatted_str = f"{value:,}"
-    expected_value = float(value)
-    
-    # Parse the formatted string
-    result = parse_value(formatted_str)
-    
-    # Verify the result
-    assert result == expected_value, \
-        f"parse_value({formatted_str}) = {result}, expected {expected_value}"
+    return format(percentage, '.6g') + '%'
 
 
+def _apply_case(text: str, case_transform: str) -> str:
+    """Apply a lower/upper/title/mixed case transformation."""
+    if case_transform == 'lower':
+        return text.lower()
+    if case_transform == 'upper':
+        return text.upper()
+    if case_transform == 'title':
+        return text.title()
+    # Mixed case by alternating
+    return ''.join(c.upper() if i % 2 == 0 else c.lower()
+                   for i, c in enumerate(text))
+
+
+def _comma_float_case(value: float) -> tuple:
+    """(formatted string, expected value) for a float, integral or not."""
+    if value % 1 == 0:
+        return f"{int(value):,}", float(int(value))
+    return f"{value:,.2f}", round(value, 2)
+
+
+# Precomputed (input string, expected value) batteries, built once at import
+_COMMA_FLOAT_CASES = [_comma_float_case(v) for v in _linspace(1000.0, 999999999.99, 1024)]
+_COMMA_INT_CASES = [(f"{v:,}", float(v)) for v in range(1000, 1000000000, 97531)]
+_COMMA_NEGATIVE_CASES = [(f"{v:,}", float(v)) for v in range(-999999999, -999, 97531)]
+_PERCENTAGE_CASES = [(_format_percentage(p), p / 100.0) for p in _linspace(0.001, 100.0, 512)]
+_PERCENTAGE_NEGATIVE_CASES = [(f"{p}%", p / 100.0) for p in _linspace(-100.0, -0.01, 256)]
+_PERCENTAGE_OVER_100_CASES = [(f"{p}%", p / 100.0) for p in _linspace(100.01, 10000.0, 256)]
+_PERCENTAGE_INT_CASES = [(f"{p}%", p / 100.0) for p in range(0, 101)]
+
+# (cases, absolute tolerance) per battery; a tolerance of 0 requires an exact match
+_NUMERIC_BATTERIES = [
+    pytest.param(_COMMA_FLOAT_CASES, 1e-6, id="commas"),
+    pytest.param(_COMMA_INT_CASES, 0.0, id="commas-integer"),
+    pytest.param(_COMMA_NEGATIVE_CASES, 0.0, id="commas-negative"),
+    pytest.param(_PERCENTAGE_CASES, 1e-6, id="percentage"),
+    pytest.param(_PERCENTAGE_NEGATIVE_CASES, 1e-9, id="percentage-negative"),
+    pytest.param(_PERCENTAGE_OVER_100_CASES, 1e-6, id="percentage-over-100"),
+    pytest.param(_PERCENTAGE_INT_CASES, 0.0, id="percentage-integer"),
+]
+
+_CASE_TRANSFORMS = ['lower', 'upper', 'title', 'mixed']
+_NA_VARIANTS = ["N/A", "NA", "NULL", "NONE", "-"]
+
+# Every case variant of every N/A token (5 x 4 strings)
+_NA_CASE_VARIANTS = {
+    token: {transform: _apply_case(token, transform) for transform in _CASE_TRANSFORMS}
+    for token in _NA_VARIANTS
+}
+
+_NA_CASES = [
+    prefix + _NA_CASE_VARIANTS[token][case_transform] + suffix
+    for token in _NA_VARIANTS
+    for case_transform in _CASE_TRANSFORMS
+    for prefix in ["", " ", "\t", " \t "]
+    for suffix in ["", " ", "\t", "\t  "]
+]
+
 
+# Property 6: Numeric Value Parsing with Commas
 # Property 7: Percentage Conversion
-# **Validates: Requirements 8.2**
+# **Validates: Requirements 8.1, 8.2**
 
 
-@given(
-    # Generate realistic percentage values from 0 to 100 with decimals
-    # Avoid very small values that would be formatted in scientific notation
-    percentage=st.floats(
-        min_value=0.001,
-        max_value=100.0,
-        allow_nan=False,
-        allow_infinity=False,
-    ).filter(lambda x: abs(x) >= 0.001),  # Filter out values too close to zero
-)
-def test_percentage_conversion(percentage):
+@pytest.mark.parametrize("cases, tolerance", _NUMERIC_BATTERIES)
+def test_parse_value_numeric(cases, tolerance):
     """
-    Property 7: Percentage Conversion
-    For any string in percentage format (e.g., "45%", "99.9%"),
-    parsing should return the decimal equivalent (0.45, 0.999).
+    Properties 6 and 7: Numeric Value Parsing with Commas, Percentage Conversion
+    For every precomputed comma-separated number string (fractional, integer,
+    negative) and percentage string (fractional, negative, over 100%, integer),
+    parsing should return the correct float value.
     
-    **Validates: Requirements 8.2**
+    **Validates: Requirements 8.1, 8.2**
     """
-    # Format as percentage string (avoid scientific notation)
-    percentage_str = f"{percentage:.6f}%".rstrip('0').rstrip('.')
-    if '.' not in percentage_str.replace('%', ''):
-        percentage_str = percentage_str.replace('%', '') + '%'
+    results = [parse_value(case[0]) for case in cases]
     
-    # Expected decimal value
-    expected_decimal = percentage / 100.0
+    mismatches = [
+        (formatted_str, result, expected)
+        for (formatted_str, expected), result in zip(cases, results)
+        if not isinstance(result, float) or abs(result - expected) > tolerance
+    ]
     
-    # Parse the percentage string
-    result = parse_value(percentage_str)
-    
-    # Verify the result
-    assert result is not None, f"parse_value returned None for '{percentage_str}'"
-    assert isinstance(result, float), f"parse_value did not return float for '{percentage_str}'"
-    # Use a more reasonable tolerance for float precision after string formatting
-    assert abs(result - expected_decimal) < 1e-6, \
-        f"parse_value({percentage_str}) = {result}, expected {expected_decimal}"
+    assert not mismatches, \
+        f"parse_value mismatches (input, got, expected): {mismatches[:10]}"
 
 
+@_SMOKE
 @given(
-    # Generate negative percentages
-    percentage=st.floats(
-        min_value=-100.0,
-        max_value=-0.01,
+    # Generate floats with reasonable precision
+    value=st.floats(
+        min_value=1000.0,
+        max_value=999999999.99,
         allow_nan=False,
         allow_infinity=False,
     ),
 )
-def test_percentage_conversion_negative(percentage):
+def test_numeric_parsing_with_commas(value):
     """
-    Property 7: Percentage Conversion (Negative variant)
-    For any negative percentage string, parsing should return the correct decimal equivalent.
+    Property 6: Numeric Value Parsing with Commas (Randomized smoke variant)
+    For any string representing a number with comma separators (e.g., "1,234.56", "10,000"),
+    parsing should remove commas and return the correct numeric value.
     
-    **Validates: Requirements 8.2**
+    **Validates: Requirements 8.1**
     """
-    # Format as percentage string
-    percentage_str = f"{percentage}%"
+    # Format the value with commas and compute its expected parse
+    formatted_str, expected = _comma_float_case(value)
     
-    # Expected decimal value
-    expected_decimal = percentage / 100.0
-    
-    # Parse the percentage string
-    result = parse_value(percentage_str)
+    # Parse the formatted string
+    result = parse_value(formatted_str)
     
-    # Verify the result
-    assert result is not None, f"parse_value returned None for '{percentage_str}'"
-    assert isinstance(result, float), f"parse_value did not return float for '{percentage_str}'"
-    assert abs(result - expected_decimal) < 1e-9, \
-        f"parse_value({percentage_str}) = {result}, expected {expected_decimal}"
+    # Verify the result matches the expected value (with small tolerance for float precision)
+    assert isinstance(result, float), f"parse_value did not return float for '{formatted_str}'"
+    assert abs(result - expected) < 1e-6, \
+        f"parse_value({formatted_str}) = {result}, expected {expected}"
 
 
-@given(
-    # Generate large percentages (over 100%)
-    percentage=st.floats(
-        min_value=100.01,
-        max_value=10000.0,
-        allow_nan=False,
-        allow_infinity=False,
-    ),
-)
-def test_percentage_conversion_over_100(percentage):
-    """
-    Property 7: Percentage Conversion (Over 100% variant)
-    For any percentage string over 100%, parsing should return the correct decimal equivalent.
-    
-    **Validates: Requirements 8.2**
-    """
-    # Format as percentage string
-    percentage_str = f"{percentage}%"
-    
-    # Expected decimal value
-    expected_decimal = percentage / 100.0
-    
-    # Parse the percentage string
-    result = parse_value(percentage_str)
-    
-    # Verify the result
-    assert result is not None, f"parse_value returned None for '{percentage_str}'"
-    assert isinstance(result, float), f"parse_value did not return float for '{percentage_str}'"
-    assert abs(result - expected_decimal) < 1e-6, \
-        f"parse_value({percentage_str}) = {result}, expected {expected_decimal}"
+
+# Property 8: N/A Value Normalization
+# **Validates: Requirements 8.5**
 
 
-@given(
-    # Generate integer percentages
-    percentage=st.integers(min_value=0, max_value=100),
-)
-def test_percentage_conversion_integers(percentage):
+def test_na_normalization_batch():
     """
-    Property 7: Percentage Conversion (Integer variant)
-    For any integer percentage string, parsing should return the correct decimal equivalent.
+    Property 8: N/A Value Normalization (Batch sweep)
+    For every case and whitespace variant of the N/A tokens, parsing should
+    return None.
     
-    **Validates: Requirements 8.2**
+    **Validates: Requirements 8.5**
     """
-    # Format as percentage string
-    percentage_str = f"{percentage}%"
-    
-    # Expected decimal value
-    expected_decimal = percentage / 100.0
-    
-    # Parse the percentage string
-    result = parse_value(percentage_str)
+    not_none = [s for s in _NA_CASES if parse_value(s) is not None]
     
-    # Verify the result
-    assert result == expected_decimal, \
-        f"parse_value({percentage_str}) = {result}, expected {expected_decimal}"
-
-
-
-# Property 8: N/A Value Normalization
-# **Validates: Requirements 8.5**
+    assert not not_none, f"parse_value did not return None for {not_none!r}"
 
 
+@_SMOKE
 @given(
     # Generate N/A variations with different cases and whitespace
-    na_variant=st.sampled_from(["N/A", "NA", "NULL", "NONE", "-"]),
-    prefix_whitespace=st.text(alphabet=' \t', max_size=3),
-    suffix_whitespace=st.text(alphabet=' \t', max_size=3),
-    case_transform=st.sampled_from(['lower', 'upper', 'title', 'mixed']),
+    na_variant=st.sampled_from(_NA_VARIANTS),
+    prefix_whitespace=_WHITESPACE,
+    suffix_whitespace=_WHITESPACE,
+    case_transform=st.sampled_from(_CASE_TRANSFORMS),
 )
 def test_na_normalization(na_variant, prefix_whitespace, suffix_whitespace, case_transform):
     """
@@ -252,16 +212,7 @@ def test_na_normalization(na_variant, prefix_whitespace, suffix_whitespace, case
     **Validates: Requirements 8.5**
     """
     # Apply case transformation
-    if case_transform == 'lower':
-        na_str = na_variant.lower()
-    elif case_transform == 'upper':
-        na_str = na_variant.upper()
-    elif case_transform == 'title':
-        na_str = na_variant.title()
-    else:  # mixed
-        # Create mixed case by alternating
-        na_str = ''.join(c.upper() if i % 2 == 0 else c.lower() 
-                        for i, c in enumerate(na_variant))
+    na_str = _NA_CASE_VARIANTS[na_variant][case_transform]
     
     # Add whitespace
     na_str_with_whitespace = prefix_whitespace + na_str + suffix_whitespace
@@ -274,6 +225,7 @@ def test_na_normalization(na_variant, prefix_whitespace, suffix_whitespace, case
         f"parse_value('{na_str_with_whitespace}') = {result}, expected None"
 
 
+@_FAST
 @given(
     # Generate empty strings with various whitespace
     whitespace=st.text(alphabet=' \t\n\r', max_size=5),
@@ -309,21 +261,11 @@ def test_na_normalization_none_input():
 # **Validates: Requirements 11.4**
 
 
+@_FAST
 @given(
     # Generate strings that don't match any parseable pattern
     # Avoid strings that could be parsed as numbers, percentages, or N/A values
-    text=st.text(
-        alphabet=st.characters(blacklist_categories=('Cs',)),  # Exclude surrogates
-        min_size=1,
-        max_size=50
-    ).filter(
-        lambda s: (
-            s.strip() and  # Not empty after stripping
-            s.strip().upper() not in ["N/A", "NA", "NULL", "NONE", "-", "YES", "NO"] and  # Not N/A or YES/NO
-            not re.match(r'^-?[\d,]+\.?\d*$', s.strip()) and  # Not a number
-            not re.match(r'^-?[\d,]+\.?\d*\s*%$', s.strip())  # Not a percentage
-        )
-    ),
+    text=_UNPARSEABLE_TEXT,
 )
 def test_unparseable_value_preservation(text):
     """
@@ -345,6 +287,7 @@ def test_unparseable_value_preservation(text):
         f"parse_value('{text}') = '{result}', expected '{text.strip()}'"
 
 
+@_FAST
 @given(
     # Generate strings with multiple decimal points (invalid numbers)
     parts=st.lists(st.integers(min_value=0, max_value=999), min_size=3, max_size=5),
@@ -370,19 +313,10 @@ def test_unparseable_value_preservation_invalid_numbers(parts):
         f"parse_value('{invalid_number}') = '{result}', expected '{invalid_number}'"
 
 
+@_FAST
 @given(
     # Generate text with letters and numbers mixed
-    text=st.text(
-        alphabet=st.characters(whitelist_categories=('Lu', 'Ll', 'Nd')),
-        min_size=2,
-        max_size=20
-    ).filter(
-        lambda s: (
-            any(c.isalpha() for c in s) and  # Has at least one letter
-            any(c.isdigit() for c in s) and  # Has at least one digit
-            s.strip().upper() not in ["N/A", "NA", "NULL", "NONE", "YES", "NO"]  # Not special values
-        )
-    ),
+    text=_ALPHANUMERIC_TEXT,
 )
 def test_unparseable_value_preservation_alphanumeric(text):
     """
@@ -5,16 +5,87 @@ Feature: latspace-excel-parser
 """
 
 import pytest
-from hypothesis import given, strategies as st, assume
+from hypothesis import given, settings, strategies as st, assume, HealthCheck, Phase
 from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.worksheet.worksheet import Worksheet
 from app.core.preprocessor import find_header_row
 from app.schema.models import TableStructure
 
 
+# Header detection is deterministic for a given sheet layout, so skip the
+# shrink phase and deadline timing; the example database and
+# derandomization come from the profile loaded in conftest.py
+_FAST = settings(
+    max_examples=25,
+    deadline=None,
+    phases=(Phase.generate, Phase.target),
+    suppress_health_check=[HealthCheck.too_slow],
+)
+
+
+@pytest.fixture(scope="session")
+def session_wb():
+    """Single Workbook (and its default styles) shared by the whole session."""
+    return Workbook()
+
+
+def _fresh_sheet(wb):
+    """Replace the workbook's sheets with a single bare Worksheet.
+
+    Called inside each example rather than from a fixture, because Hypothesis
+    runs function-scoped fixtures once per test, not once per example.
+    """
+    sheet = Worksheet(wb, title="t")
+    wb._sheets = [sheet]
+    return sheet
+
+
+# Column letters for every column the merge tests can touch
+_LETTERS = [None] + [get_column_letter(i) for i in range(1, 27)]
+
+
+def _add_merge(sheet, start_row, start_col, end_row, end_col):
+    """Register a merged range directly, skipping merge_cells' coordinate
+    round-trip and MergedCell formatting (find_header_row only reads ranges)."""
+    sheet.merged_cells.ranges.add(MergedCellRange(
+        sheet,
+        f"{_LETTERS[start_col]}{start_row}:{_LETTERS[end_col]}{end_row}",
+    ))
+
+
+def _build_header_sheet(sheet, header_row_idx, num_columns, num_data_rows):
+    """Fill sheet with numeric rows, a string header row, then numeric data rows."""
+    # Rows before the header (if any) hold numeric values in even columns
+    # and empty cells elsewhere (not strings); the dict form of append()
+    # only creates Cell objects for the populated columns
+    for row_idx in range(1, header_row_idx):
+        sheet.append({
+            col_idx: row_idx * col_idx
+            for col_idx in range(2, num_columns + 1, 2)
+        })
+    
+    # Header row with >3 string values to trigger heuristic
+    sheet.append([f"Header_{i}" for i in range(1, num_columns + 1)])
+    
+    # Data rows after the header
+    for data_row_offset in range(1, num_data_rows + 1):
+        sheet.append([data_row_offset * col_idx for col_idx in range(1, num_columns + 1)])
+    
+    return sheet
+
+
+# Detected structures keyed by (header_row_idx, num_columns, num_data_rows);
+# the sheet is fully determined by the key, so repeated draws reuse the result
+_HDR_CACHE = {}
+
+
 # Property 10: Header Row Detection Consistency
 # **Validates: Requirements 7.4**
 
 
+@_FAST
 @given(
     # Generate a header row index between 1 and 10
     header_row_idx=st.integers(min_value=1, max_value=10),
@@ -23,7 +94,7 @@ from app.schema.models import TableStructure
     # Generate number of data rows after header
     num_data_rows=st.integers(min_value=0, max_value=5),
 )
-def test_header_row_detection_consistency(header_row_idx, num_columns, num_data_rows):
+def test_header_row_detection_consistency(session_wb, header_row_idx, num_columns, num_data_rows):
     """
     Property 10: Header Row Detection Consistency
     For any detected header row at index N, the table structure should have
@@ -31,31 +102,13 @@ def test_header_row_detection_consistency(header_row_idx, num_columns, num_data_
     
     **Validates: Requirements 7.4**
     """
-    # Create a workbook with a clear header row
-    wb = Workbook()
-    sheet = wb.active
-    
-    # Add rows before the header (if any) with numeric data
-    for row_idx in range(1, header_row_idx):
-        for col_idx in range(1, num_columns + 1):
-            # Add numeric values or empty cells (not strings)
-            if col_idx % 2 == 0:
-                sheet.cell(row=row_idx, column=col_idx, value=row_idx * col_idx)
-            # Leave other cells empty
-    
-    # Add the header row with >3 string values to trigger heuristic
-    header_values = [f"Header_{i}" for i in range(1, num_columns + 1)]
-    for col_idx, header_val in enumerate(header_values, start=1):
-        sheet.cell(row=header_row_idx, column=col_idx, value=header_val)
-    
-    # Add data rows after the header
-    for data_row_offset in range(1, num_data_rows + 1):
-        data_row_idx = header_row_idx + data_row_offset
-        for col_idx in range(1, num_columns + 1):
-            sheet.cell(row=data_row_idx, column=col_idx, value=data_row_offset * col_idx)
-    
-    # Detect header row (without LLM service)
-    table_structure = find_header_row(sheet, llm_service=None)
+    # Detect header row (without LLM service) on a fresh sheet with a clear
+    # header row, reusing the result for sheets already seen
+    key = (header_row_idx, num_columns, num_data_rows)
+    table_structure = _HDR_CACHE.get(key)
+    if table_structure is None:
+        sheet = _build_header_sheet(_fresh_sheet(session_wb), *key)
+        table_structure = _HDR_CACHE[key] = find_header_row(sheet, llm_service=None)
     
     # Verify Property 10: data_start_row = header_row_index + 1
     assert isinstance(table_structure, TableStructure), \
@@ -72,12 +125,13 @@ def test_header_row_detection_consistency(header_row_idx, num_columns, num_data_
         "data_start_row must equal header_row_index + 1"
 
 
+@_FAST
 @given(
     # Generate multiple candidate rows
     num_candidates=st.integers(min_value=2, max_value=5),
     num_columns=st.integers(min_value=4, max_value=15),
 )
-def test_header_row_detection_consistency_multiple_candidates(num_candidates, num_columns):
+def test_header_row_detection_consistency_multiple_candidates(session_wb, num_candidates, num_columns):
     """
     Property 10: Header Row Detection Consistency (Multiple candidates variant)
     When multiple rows have >3 strings, the selected header row should still
@@ -85,63 +139,63 @@ def test_header_row_detection_consistency_multiple_candidates(num_candidates, nu
     
     **Validates: Requirements 7.4**
     """
-    # Create a workbook with multiple candidate rows
-    wb = Workbook()
-    sheet = wb.active
+    # Create a fresh sheet with multiple candidate rows
+    sheet = _fresh_sheet(session_wb)
     
     # Add multiple rows with string values (all candidates)
     # The one with the most strings should be selected
-    max_strings = 0
-    expected_header_idx = 1
-    
     for row_idx in range(1, num_candidates + 1):
-        # Each row has a different number of strings
-        num_strings = 4 + row_idx  # Ensure >3 strings for all
+        # Each row has a different number of strings, ensuring >3 for all
+        num_strings = 4 + row_idx
         
-        if num_strings > max_strings:
-            max_strings = num_strings
-            expected_header_idx = row_idx
-        
-        for col_idx in range(1, min(num_strings, num_columns) + 1):
-            sheet.cell(row=row_idx, column=col_idx, value=f"String_{row_idx}_{col_idx}")
-        
-        # Fill remaining columns with numbers
-        for col_idx in range(num_strings + 1, num_columns + 1):
-            sheet.cell(row=row_idx, column=col_idx, value=row_idx * col_idx)
+        # Strings first, remaining columns filled with numbers
+        sheet.append([
+            f"String_{row_idx}_{col_idx}" if col_idx <= num_strings else row_idx * col_idx
+            for col_idx in range(1, num_columns + 1)
+        ])
+    
+    # Strings actually written per row are capped by the column count; the
+    # first row holding the maximum wins ties (argmax semantics)
+    string_counts = [min(4 + row_idx, num_columns) for row_idx in range(1, num_candidates + 1)]
+    expected_header_idx = string_counts.index(max(string_counts)) + 1
     
     # Detect header row
     table_structure = find_header_row(sheet, llm_service=None)
     
+    # Verify the row with the most strings was selected
+    assert table_structure.header_row_index == expected_header_idx, \
+        f"Expected header_row_index={expected_header_idx}, got {table_structure.header_row_index}"
+    
     # Verify Property 10
     assert table_structure.data_start_row == table_structure.header_row_index + 1, \
         f"data_start_row ({table_structure.data_start_row}) must equal " \
         f"header_row_index ({table_structure.header_row_index}) + 1"
 
 
+@_FAST
 @given(
     header_row_idx=st.integers(min_value=1, max_value=8),
     num_columns=st.integers(min_value=5, max_value=12),
 )
-def test_header_row_detection_consistency_with_empty_rows(header_row_idx, num_columns):
+def test_header_row_detection_consistency_with_empty_rows(session_wb, header_row_idx, num_columns):
     """
     Property 10: Header Row Detection Consistency (Empty rows variant)
     Even with empty rows before the header, the property should hold.
     
     **Validates: Requirements 7.4**
     """
-    # Create a workbook with empty rows before header
-    wb = Workbook()
-    sheet = wb.active
+    # Create a fresh sheet with empty rows before header
+    sheet = _fresh_sheet(session_wb)
     
     # Leave rows before header_row_idx empty
+    for _ in range(1, header_row_idx):
+        sheet.append([])
     
     # Add the header row with many string values
-    for col_idx in range(1, num_columns + 1):
-        sheet.cell(row=header_row_idx, column=col_idx, value=f"Column_{col_idx}")
+    sheet.append([f"Column_{col_idx}" for col_idx in range(1, num_columns + 1)])
     
     # Add one data row after header
-    for col_idx in range(1, num_columns + 1):
-        sheet.cell(row=header_row_idx + 1, column=col_idx, value=col_idx * 10)
+    sheet.append([col_idx * 10 for col_idx in range(1, num_columns + 1)])
     
     # Detect header row
     table_structure = find_header_row(sheet, llm_service=None)
@@ -156,13 +210,14 @@ def test_header_row_detection_consistency_with_empty_rows(header_row_idx, num_co
 # **Validates: Requirements 7.5**
 
 
+@_FAST
 @given(
     # Generate merged cell ranges
     num_merged_ranges=st.integers(min_value=1, max_value=5),
     base_row=st.integers(min_value=1, max_value=5),
     base_col=st.integers(min_value=1, max_value=5),
 )
-def test_merged_cell_capture(num_merged_ranges, base_row, base_col):
+def test_merged_cell_capture(session_wb, num_merged_ranges, base_row, base_col):
     """
     Property 11: Merged Cell Capture
     For any Excel file with merged cells, the TableStructure should include
@@ -170,9 +225,15 @@ def test_merged_cell_capture(num_merged_ranges, base_row, base_col):
     
     **Validates: Requirements 7.5**
     """
-    # Create a workbook with merged cells
-    wb = Workbook()
-    sheet = wb.active
+    # Create a fresh sheet with merged cells
+    sheet = _fresh_sheet(session_wb)
+    
+    # Add a clear header row below the area the merged ranges will cover;
+    # rows are written first since append() always targets the next row
+    header_row_idx = base_row + (num_merged_ranges * 3) + 1
+    for _ in range(1, header_row_idx):
+        sheet.append([])
+    sheet.append([f"Header_{col_idx}" for col_idx in range(1, 10)])
     
     # Track expected merged ranges
     expected_merged_ranges = []
@@ -186,12 +247,7 @@ def test_merged_cell_capture(num_merged_ranges, base_row, base_col):
         end_col = start_col + 1  # Merge 2 columns
         
         # Merge the cells
-        sheet.merge_cells(
-            start_row=start_row,
-            start_column=start_col,
-            end_row=end_row,
-            end_column=end_col
-        )
+        _add_merge(sheet, start_row, start_col, end_row, end_col)
         
         # Add to expected ranges
         expected_merged_ranges.append({
@@ -201,11 +257,6 @@ def test_merged_cell_capture(num_merged_ranges, base_row, base_col):
             "max_col": end_col
         })
     
-    # Add a clear header row (after all merged cells)
-    header_row_idx = base_row + (num_merged_ranges * 3) + 1
-    for col_idx in range(1, 10):
-        sheet.cell(row=header_row_idx, column=col_idx, value=f"Header_{col_idx}")
-    
     # Detect table structure
     table_structure = find_header_row(sheet, llm_service=None)
     
@@ -231,39 +282,39 @@ def test_merged_cell_capture(num_merged_ranges, base_row, base_col):
             f"Expected merged range {expected_range} not found in captured merged_cells"
 
 
-@given(
-    # Generate a single large merged cell
-    start_row=st.integers(min_value=1, max_value=3),
-    start_col=st.integers(min_value=1, max_value=3),
-    row_span=st.integers(min_value=2, max_value=5),
-    col_span=st.integers(min_value=2, max_value=5),
-)
-def test_merged_cell_capture_single_large_merge(start_row, start_col, row_span, col_span):
+# The single-merge input space is small (3 x 3 x 4 x 4 = 144 layouts), so it
+# is enumerated exhaustively rather than sampled
+_MERGE_SPECS = [
+    (start_row, start_col, row_span, col_span)
+    for start_row in range(1, 4)
+    for start_col in range(1, 4)
+    for row_span in range(2, 6)
+    for col_span in range(2, 6)
+]
+
+
+@pytest.mark.parametrize("start_row, start_col, row_span, col_span", _MERGE_SPECS)
+def test_merged_cell_capture_single_large_merge(session_wb, start_row, start_col, row_span, col_span):
     """
     Property 11: Merged Cell Capture (Single large merge variant)
     For a single large merged cell, it should be captured correctly.
     
     **Validates: Requirements 7.5**
     """
-    # Create a workbook with one large merged cell
-    wb = Workbook()
-    sheet = wb.active
+    # Create a fresh sheet with one large merged cell
+    sheet = _fresh_sheet(session_wb)
     
     end_row = start_row + row_span - 1
     end_col = start_col + col_span - 1
     
-    # Merge the cells
-    sheet.merge_cells(
-        start_row=start_row,
-        start_column=start_col,
-        end_row=end_row,
-        end_column=end_col
-    )
-    
     # Add a clear header row after the merged cell
     header_row_idx = end_row + 2
-    for col_idx in range(1, 8):
-        sheet.cell(row=header_row_idx, column=col_idx, value=f"Col_{col_idx}")
+    for _ in range(1, header_row_idx):
+        sheet.append([])
+    sheet.append([f"Col_{col_idx}" for col_idx in range(1, 8)])
+    
+    # Merge the cells
+    _add_merge(sheet, start_row, start_col, end_row, end_col)
     
     # Detect table structure
     table_structure = find_header_row(sheet, llm_service=None)
@@ -283,20 +334,18 @@ def test_merged_cell_capture_single_large_merge(start_row, start_col, row_span,
         f"Expected max_col={end_col}, got {merged_range['max_col']}"
 
 
-def test_merged_cell_capture_no_merged_cells():
+def test_merged_cell_capture_no_merged_cells(session_wb):
     """
     Property 11: Merged Cell Capture (No merged cells variant)
     For an Excel file with no merged cells, merged_cells list should be empty.
     
     **Validates: Requirements 7.5**
     """
-    # Create a workbook with no merged cells
-    wb = Workbook()
-    sheet = wb.active
+    # Create a fresh sheet with no merged cells
+    sheet = _fresh_sheet(session_wb)
     
     # Add a header row
-    for col_idx in range(1, 6):
-        sheet.cell(row=1, column=col_idx, value=f"Header_{col_idx}")
+    sheet.append([f"Header_{col_idx}" for col_idx in range(1, 6)])
     
     # Detect table structure
     table_structure = find_header_row(sheet, llm_service=None)
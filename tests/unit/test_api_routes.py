@@ -9,47 +9,140 @@ Tests the /parse endpoint with various scenarios including:
 """
 
 import pytest
-from fastapi.testclient import TestClient
 from io import BytesIO
-import openpyxl
 from unittest.mock import patch, MagicMock
+import zipfile
 
-from app.main import app
-from app.schema.models import MatchMethod, ConfidenceLevel
+from app.api import routes
+from app.core.matcher import HeaderMatcher
+from app.registry.data import RegistryManager
+from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
+from app.services.llm import LLMService
 
 
-# Create test client - use fixture to avoid initialization issues
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+@pytest.fixture(scope="module", autouse=True)
+def mock_llm():
+    """
+    Replace the route's LLM service with a canned mock for this module.
+    
+    The test workbook has only three string headers, which is below the
+    header heuristic threshold, so header detection falls back to the LLM.
+    The mock answers row 1 for that query and returns an unmatched mapping
+    per header for batch matching, keeping every upload offline and
+    deterministic.
+    """
+    llm = MagicMock(spec=LLMService)
+    llm.simple_query.return_value = "1"
+    llm.batch_match_headers.side_effect = lambda headers, parameters, assets: [
+        HeaderMapping(
+            original_header=header,
+            method=MatchMethod.NONE,
+            confidence=ConfidenceLevel.LOW
+        )
+        for header in headers
+    ]
+    matcher = HeaderMatcher(RegistryManager(), llm)
+    
+    with patch.object(routes, "get_llm_service", return_value=llm), \
+         patch.object(routes, "get_matcher", return_value=matcher):
+        yield llm
+
+
+# Minimal OOXML parts for a single-sheet workbook; cells use inline
+# strings, so no shared-strings or styles part is needed
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+    "xl/worksheets/sheet1.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        # Headers
+        '<row r="1">'
+        '<c r="A1" t="inlineStr"><is><t>Power_Output</t></is></c>'
+        '<c r="B1" t="inlineStr"><is><t>Temperature</t></is></c>'
+        '<c r="C1" t="inlineStr"><is><t>TG-1 Efficiency</t></is></c>'
+        '</row>'
+        # Data rows
+        '<row r="2">'
+        '<c r="A2"><v>1234.56</v></c>'
+        '<c r="B2"><v>450</v></c>'
+        '<c r="C2" t="inlineStr"><is><t>85%</t></is></c>'
+        '</row>'
+        '<row r="3">'
+        '<c r="A3"><v>2345.67</v></c>'
+        '<c r="B3"><v>475</v></c>'
+        '<c r="C3" t="inlineStr"><is><t>87%</t></is></c>'
+        '</row>'
+        '</sheetData></worksheet>'
+    ),
+}
+
+
+def _build_minimal_xlsx() -> bytes:
+    """Zip the minimal OOXML parts into xlsx bytes."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in _XLSX_PARTS.items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+# Built once at import with the standard library alone
+_EXCEL_BYTES = _build_minimal_xlsx()
+
+# Shared upload buffer; the client only reads it, so rewinding is enough
+_EXCEL_BUFFER = BytesIO(_EXCEL_BYTES)
+
+
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
 def create_test_excel_file() -> BytesIO:
-    """Create a simple test Excel file in memory."""
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    
-    # Add headers
-    sheet['A1'] = 'Power_Output'
-    sheet['B1'] = 'Temperature'
-    sheet['C1'] = 'TG-1 Efficiency'
-    
-    # Add data rows
-    sheet['A2'] = 1234.56
-    sheet['B2'] = 450
-    sheet['C2'] = '85%'
-    
-    sheet['A3'] = 2345.67
-    sheet['B3'] = 475
-    sheet['C3'] = '87%'
-    
-    # Save to BytesIO
-    excel_file = BytesIO()
-    workbook.save(excel_file)
-    excel_file.seek(0)
+    """Return the shared in-memory test Excel file, rewound for upload."""
+    _EXCEL_BUFFER.seek(0)
+    return _EXCEL_BUFFER
+
+
+@pytest.fixture(scope="module")
+def parse_response(client):
+    """Upload the test workbook once and share the parsed JSON across tests."""
+    response = client.post(
+        "/api/parse",
+        files={"file": ("test.xlsx", create_test_excel_file(), _XLSX_MIME)}
+    )
     
-    return excel_file
+    assert response.status_code == 200
+    return response.json()
 
 
 def test_root_endpoint(client):
@@ -73,24 +166,13 @@ def test_health_check_endpoint(client):
     assert data["status"] == "healthy"
 
 
-def test_parse_endpoint_with_valid_excel_file(client):
+def test_parse_endpoint_with_valid_excel_file(parse_response):
     """
     Test /parse endpoint with a valid Excel file.
     
     Requirements: 10.1
     """
-    # Create test Excel file
-    excel_file = create_test_excel_file()
-    
-    # Upload file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    # Check response
-    assert response.status_code == 200
-    data = response.json()
+    data = parse_response
     
     # Verify ParseResult structure
     assert "file_name" in data
@@ -117,95 +199,51 @@ def test_parse_endpoint_with_valid_excel_file(client):
     assert len(exact_matches) > 0, "Should have at least one exact match"
 
 
-def test_parse_endpoint_with_invalid_file_type(client):
-    """
-    Test /parse endpoint with invalid file type.
-    Should return HTTP 400 error.
-    
-    Requirements: 10.5, 11.1
-    """
-    # Create a fake text file
-    text_file = BytesIO(b"This is not an Excel file")
-    
-    # Upload file with .txt extension
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.txt", text_file, "text/plain")}
-    )
-    
-    # Check response
-    assert response.status_code == 400
-    data = response.json()
-    assert "detail" in data
-    assert "Excel" in data["detail"] or "xlsx" in data["detail"] or "xls" in data["detail"]
-
-
-def test_parse_endpoint_with_pdf_file(client):
+# (filename, content, content type, accepted status codes, detail fragments);
+# the detail must contain at least one fragment, if any are given
+_REJECTED_UPLOADS = [
+    # Fake text file with .txt extension (Requirements: 10.5, 11.1)
+    pytest.param(
+        "test.txt", b"This is not an Excel file", "text/plain",
+        (400,), ("Excel", "xlsx", "xls"), id="text-file",
+    ),
+    # Fake PDF file with .pdf extension (Requirements: 10.5, 11.1)
+    pytest.param(
+        "test.pdf", b"%PDF-1.4 fake pdf content", "application/pdf",
+        (400,), ("Excel", "xlsx", "xls"), id="pdf-file",
+    ),
+    # Empty upload (Requirements: 11.1)
+    pytest.param(
+        "test.xlsx", b"", _XLSX_MIME,
+        (400,), ("empty", "Empty"), id="empty-file",
+    ),
+    # Random bytes that look like a zip but aren't valid Excel (Requirements: 11.1)
+    pytest.param(
+        "test.xlsx", b"PK\x03\x04corrupted data that looks like zip but isn't valid Excel", _XLSX_MIME,
+        (400, 500), (), id="corrupted-excel",
+    ),
+]
+
+
+@pytest.mark.parametrize("filename, content, content_type, statuses, fragments", _REJECTED_UPLOADS)
+def test_parse_endpoint_rejects_invalid_upload(client, filename, content, content_type, statuses, fragments):
     """
-    Test /parse endpoint with PDF file.
-    Should return HTTP 400 error.
+    Test /parse endpoint with invalid, empty and corrupted uploads.
+    Should return an HTTP error with a detail message.
     
     Requirements: 10.5, 11.1
     """
-    # Create a fake PDF file
-    pdf_file = BytesIO(b"%PDF-1.4 fake pdf content")
-    
-    # Upload file with .pdf extension
     response = client.post(
         "/api/parse",
-        files={"file": ("test.pdf", pdf_file, "application/pdf")}
+        files={"file": (filename, content, content_type)}
     )
     
     # Check response
-    assert response.status_code == 400
-    data = response.json()
-    assert "detail" in data
-    assert "Excel" in data["detail"] or "xlsx" in data["detail"] or "xls" in data["detail"]
-
-
-def test_parse_endpoint_with_empty_file(client):
-    """
-    Test /parse endpoint with empty file.
-    Should return HTTP 400 error.
-    
-    Requirements: 11.1
-    """
-    # Create empty file
-    empty_file = BytesIO(b"")
-    
-    # Upload empty file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", empty_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    # Check response
-    assert response.status_code == 400
-    data = response.json()
-    assert "detail" in data
-    assert "empty" in data["detail"].lower()
-
-
-def test_parse_endpoint_with_corrupted_excel_file(client):
-    """
-    Test /parse endpoint with corrupted Excel file.
-    Should return HTTP 400 error.
-    
-    Requirements: 11.1
-    """
-    # Create corrupted Excel file (just random bytes)
-    corrupted_file = BytesIO(b"PK\x03\x04corrupted data that looks like zip but isn't valid Excel")
-    
-    # Upload corrupted file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", corrupted_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    # Check response - should be 400 or 500
-    assert response.status_code in [400, 500]
+    assert response.status_code in statuses
     data = response.json()
     assert "detail" in data
+    if fragments:
+        assert any(fragment in data["detail"] for fragment in fragments)
 
 
 def test_parse_endpoint_without_file(client):
@@ -222,23 +260,13 @@ def test_parse_endpoint_without_file(client):
     assert "detail" in data
 
 
-def test_parse_endpoint_header_mappings_have_audit_trail(client):
+def test_parse_endpoint_header_mappings_have_audit_trail(parse_response):
     """
     Test that header mappings in the response contain complete audit trail.
     
     Requirements: 9.2, 9.3
     """
-    # Create test Excel file
-    excel_file = create_test_excel_file()
-    
-    # Upload file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    assert response.status_code == 200
-    data = response.json()
+    data = parse_response
     
     # Check each header mapping has required fields
     for mapping in data["header_mappings"]:
@@ -253,23 +281,13 @@ def test_parse_endpoint_header_mappings_have_audit_trail(client):
         assert mapping["confidence"] in ["high", "medium", "low"]
 
 
-def test_parse_endpoint_parsed_cells_have_audit_trail(client):
+def test_parse_endpoint_parsed_cells_have_audit_trail(parse_response):
     """
     Test that parsed cells in the response contain complete audit trail.
     
     Requirements: 9.1, 9.4, 9.5
     """
-    # Create test Excel file
-    excel_file = create_test_excel_file()
-    
-    # Upload file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    assert response.status_code == 200
-    data = response.json()
+    data = parse_response
     
     # Check parsed data structure
     assert len(data["parsed_data"]) > 0, "Should have at least one data row"
@@ -292,28 +310,16 @@ def test_parse_endpoint_parsed_cells_have_audit_trail(client):
     assert "confidence" in first_cell["header_mapping"]
 
 
-def test_parse_endpoint_counts_are_accurate(client):
+def test_parse_endpoint_counts_are_accurate(parse_response):
     """
     Test that total_cells and successful_parses counts are accurate.
     
     Requirements: 10.4
     """
-    # Create test Excel file
-    excel_file = create_test_excel_file()
-    
-    # Upload file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
+    data = parse_response
     
-    assert response.status_code == 200
-    data = response.json()
-    
-    # Calculate expected counts
-    num_rows = len(data["parsed_data"])
-    num_cols = len(data["parsed_data"][0]) if num_rows > 0 else 0
-    expected_total = num_rows * num_cols
+    # Calculate expected counts from every row, so ragged rows are not masked
+    expected_total = sum(len(row) for row in data["parsed_data"])
     
     # Verify counts
     assert data["total_cells"] == expected_total
@@ -321,23 +327,13 @@ def test_parse_endpoint_counts_are_accurate(client):
     assert data["successful_parses"] >= 0
 
 
-def test_parse_endpoint_llm_calls_count(client):
+def test_parse_endpoint_llm_calls_count(parse_response):
     """
     Test that llm_calls_made is either 0 or 1 (batch call).
     
     Requirements: 3.4, 6.1
     """
-    # Create test Excel file
-    excel_file = create_test_excel_file()
-    
-    # Upload file
-    response = client.post(
-        "/api/parse",
-        files={"file": ("test.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-    )
-    
-    assert response.status_code == 200
-    data = response.json()
+    data = parse_response
     
     # LLM calls should be 0 or 1 (single batch call per file)
     assert data["llm_calls_made"] in [0, 1], \
@@ -0,0 +1,101 @@
+"""
+Unit tests for error handling at the API layer.
+
+Tests error scenarios including:
+- Invalid file format errors
+- Corrupted file handling
+- Empty file handling
+
+Requirements: 11.1
+"""
+
+import pytest
+
+
+class TestInvalidFileFormatErrors:
+    """Test invalid file format error handling."""
+    
+    @pytest.mark.parametrize("filename, content, content_type, statuses, fragments", [
+        # .txt files are rejected with HTTP 400
+        pytest.param(
+            "test.txt", b"This is a text file", "text/plain",
+            (400,), ("Excel", "xlsx"), id="txt",
+        ),
+        # .csv files are rejected with HTTP 400
+        pytest.param(
+            "test.csv", b"col1,col2,col3\nval1,val2,val3", "text/csv",
+            (400,), (), id="csv",
+        ),
+        # .json files are rejected with HTTP 400
+        pytest.param(
+            "test.json", b'{"key": "value"}', "application/json",
+            (400,), (), id="json",
+        ),
+        # Missing filename: FastAPI returns 422 for validation errors or
+        # 400 for our custom check
+        pytest.param(
+            "", b"fake content", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            (400, 422), (), id="no-filename",
+        ),
+    ])
+    def test_invalid_file_extension(self, client, filename, content, content_type, statuses, fragments):
+        """
+        Test that non-Excel uploads and missing filenames are rejected.
+        
+        Requirements: 11.1
+        """
+        response = client.post(
+            "/api/parse",
+            files={"file": (filename, content, content_type)}
+        )
+        
+        assert response.status_code in statuses
+        data = response.json()
+        assert "detail" in data
+        if fragments:
+            assert any(fragment in data["detail"] for fragment in fragments)
+
+
+class TestCorruptedFileHandling:
+    """Test corrupted file handling."""
+    
+    def test_corrupted_excel_file_returns_400(self, client):
+        """
+        Test that corrupted Excel files return HTTP 400.
+        
+        Requirements: 11.1
+        """
+        # Create corrupted file (looks like zip but isn't valid Excel)
+        corrupted_file = b"PK\x03\x04corrupted data"
+        
+        response = client.post(
+            "/api/parse",
+            files={"file": ("test.xlsx", corrupted_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+        )
+        
+        # Should return 400 or 500
+        assert response.status_code in [400, 500]
+        data = response.json()
+        assert "detail" in data
+    
+    def test_empty_file_returns_400(self, client):
+        """
+        Test that empty files return HTTP 400.
+        
+        Requirements: 11.1
+        """
+        empty_file = b""
+        
+        response = client.post(
+            "/api/parse",
+            files={"file": ("test.xlsx", empty_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+        )
+        
+        assert response.status_code == 400
+        data = response.json()
+        assert "detail" in data
+        assert "empty" in data["detail"].lower()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,25 +1,23 @@
 """
-Unit tests for error handling across all components.
+Unit tests for error handling in the core components.
 
 Tests error scenarios including:
-- Invalid file format errors
 - No header row detected errors
 - LLM API failure handling
 - Pydantic validation errors
-- Corrupted file handling
-- Empty file handling
+- Matcher and preprocessor failures
+
+These tests never touch the FastAPI app; upload errors are covered in
+test_error_handling_api.py.
 
 Requirements: 11.1, 11.2, 11.3, 11.5
 """
 
 import pytest
-from fastapi.testclient import TestClient
-from io import BytesIO
 import openpyxl
 from unittest.mock import patch, MagicMock
 from pydantic import ValidationError
 
-from app.main import app
 from app.schema.models import (
     HeaderMapping, ParsedCell, TableStructure, ParseResult,
     MatchMethod, ConfidenceLevel
@@ -31,96 +29,78 @@ from app.registry.data import RegistryManager
 
 
 @pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+def mock_llm_service():
+    """Create a mock LLM service that rejects attributes LLMService lacks."""
+    return MagicMock(spec_set=LLMService)
 
 
-@pytest.fixture
-def mock_llm_service():
-    """Create a mock LLM service."""
-    return MagicMock(spec=LLMService)
+# Header detection only reads the sheet, so each layout is built once per
+# module and shared by the tests that need it
 
 
-@pytest.fixture
-def registry():
-    """Create a registry manager."""
-    return RegistryManager()
+@pytest.fixture(scope="module")
+def numeric_sheet():
+    """Sheet with a 5x3 grid of numbers and no clear header row."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    
+    for row_idx in range(1, 6):
+        sheet.append([row_idx, row_idx * 2, row_idx * 3])
+    
+    return sheet
 
 
-class TestInvalidFileFormatErrors:
-    """Test invalid file format error handling."""
+@pytest.fixture(scope="module")
+def two_header_sheet():
+    """Sheet with two string headers in row 1, too few for the heuristic."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
     
-    def test_invalid_file_extension_txt(self, client):
-        """
-        Test that .txt files are rejected with HTTP 400.
-        
-        Requirements: 11.1
-        """
-        text_file = BytesIO(b"This is a text file")
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("test.txt", text_file, "text/plain")}
-        )
-        
-        assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
-        assert "Excel" in data["detail"] or "xlsx" in data["detail"]
+    sheet['A1'] = 'Header1'
+    sheet['B1'] = 'Header2'
     
-    def test_invalid_file_extension_csv(self, client):
-        """
-        Test that .csv files are rejected with HTTP 400.
-        
-        Requirements: 11.1
-        """
-        csv_file = BytesIO(b"col1,col2,col3\nval1,val2,val3")
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("test.csv", csv_file, "text/csv")}
-        )
-        
-        assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
+    return sheet
+
+
+def _header_sheet(row: int):
+    """Sheet with four string headers in the given row."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
     
-    def test_invalid_file_extension_json(self, client):
-        """
-        Test that .json files are rejected with HTTP 400.
-        
-        Requirements: 11.1
-        """
-        json_file = BytesIO(b'{"key": "value"}')
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("test.json", json_file, "application/json")}
-        )
-        
-        assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
+    for col_idx in range(1, 5):
+        sheet.cell(row=row, column=col_idx, value=f'Header{col_idx}')
     
-    def test_no_filename_provided(self, client):
-        """
-        Test that missing filename is handled.
-        
-        Requirements: 11.1
-        """
-        # Create a file with no filename
-        excel_file = BytesIO(b"fake content")
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-        )
-        
-        # FastAPI returns 422 for validation errors or 400 for our custom check
-        assert response.status_code in [400, 422]
-        data = response.json()
-        assert "detail" in data
+    return sheet
+
+
+class _CorruptRowSheet:
+    """Worksheet stand-in whose row iteration raises when it reaches bad_row."""
+    
+    def __init__(self, sheet, bad_row: int):
+        self._sheet = sheet
+        self._bad_row = bad_row
+        self.max_row = sheet.max_row
+        self.max_column = sheet.max_column
+        self.merged_cells = sheet.merged_cells
+    
+    def iter_rows(self, min_row, max_row, values_only=False):
+        rows = self._sheet.iter_rows(min_row=min_row, max_row=max_row, values_only=values_only)
+        for row_idx, row in enumerate(rows, start=min_row):
+            if row_idx == self._bad_row:
+                raise ValueError(f"Corrupted row {row_idx}")
+            yield row
+
+
+@pytest.fixture(scope="module")
+def header_row1_sheet():
+    """Sheet with a clear four-column header in row 1."""
+    return _header_sheet(1)
+
+
+@pytest.fixture(scope="module")
+def header_row2_sheet():
+    """Sheet with a clear four-column header in row 2."""
+    return _header_sheet(2)
 
 
 class TestNoHeaderRowDetectedErrors:
@@ -150,20 +130,14 @@ class TestNoHeaderRowDetectedErrors:
             find_header_row(None, mock_llm_service)
     
     @patch('app.core.preprocessor._llm_detect_header_row')
-    def test_llm_detection_failure_fallback(self, mock_llm_detect, mock_llm_service):
+    def test_llm_detection_failure_fallback(self, mock_llm_detect, mock_llm_service, numeric_sheet):
         """
         Test that LLM detection failure falls back to row 1.
         
         Requirements: 11.2, 11.3
         """
-        # Create a workbook with no clear header row (all numeric)
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        
-        # Add rows with only numbers (no clear header)
-        for row_idx in range(1, 6):
-            for col_idx in range(1, 4):
-                sheet.cell(row=row_idx, column=col_idx, value=row_idx * col_idx)
+        # Sheet with no clear header row (all numeric)
+        sheet = numeric_sheet
         
         # Mock LLM detection to raise an error
         mock_llm_detect.side_effect = ValueError("LLM detection failed")
@@ -174,18 +148,13 @@ class TestNoHeaderRowDetectedErrors:
         assert result.header_row_index == 1
         assert result.data_start_row == 2
     
-    def test_llm_detect_with_invalid_response(self, mock_llm_service):
+    def test_llm_detect_with_invalid_response(self, mock_llm_service, two_header_sheet):
         """
         Test that invalid LLM response raises ValueError.
         
         Requirements: 11.3
         """
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        
-        # Add some data
-        sheet['A1'] = 'Header1'
-        sheet['B1'] = 'Header2'
+        sheet = two_header_sheet
         
         # Mock LLM to return invalid response
         mock_llm_service.simple_query.return_value = "not a number"
@@ -193,18 +162,13 @@ class TestNoHeaderRowDetectedErrors:
         with pytest.raises(ValueError, match="could not be parsed"):
             _llm_detect_header_row(sheet, mock_llm_service, 5)
     
-    def test_llm_detect_with_out_of_range_response(self, mock_llm_service):
+    def test_llm_detect_with_out_of_range_response(self, mock_llm_service, two_header_sheet):
         """
         Test that out-of-range LLM response falls back to row 1.
         
         Requirements: 11.3
         """
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        
-        # Add some data
-        sheet['A1'] = 'Header1'
-        sheet['B1'] = 'Header2'
+        sheet = two_header_sheet
         
         # Mock LLM to return out-of-range row number
         mock_llm_service.simple_query.return_value = "100"
@@ -215,11 +179,14 @@ class TestNoHeaderRowDetectedErrors:
         assert result == 1
 
 
+# Patched once for the whole class: no test here may reach the real Gemini
+# model or sleep through real backoff
+@patch('app.services.llm.time.sleep', return_value=None)
+@patch('app.services.llm.genai.GenerativeModel')
 class TestLLMAPIFailureHandling:
     """Test LLM API failure handling."""
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_llm_api_failure_returns_unmapped_headers(self, mock_model_class):
+    def test_llm_api_failure_returns_unmapped_headers(self, mock_model_class, mock_sleep):
         """
         Test that LLM API failures result in method="none" headers.
         
@@ -244,8 +211,10 @@ class TestLLMAPIFailureHandling:
             assert mapping.confidence == ConfidenceLevel.LOW
             assert mapping.matched_parameter is None
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_llm_retry_logic_exhausted(self, mock_model_class):
+    # A single attempt exercises the same retry-until-max loop; the full
+    # three-attempt run is kept behind the slow marker
+    @pytest.mark.parametrize("max_retries", [1, pytest.param(3, marks=pytest.mark.slow)])
+    def test_llm_retry_logic_exhausted(self, mock_model_class, mock_sleep, max_retries):
         """
         Test that retry logic is exhausted after max attempts.
         
@@ -256,20 +225,20 @@ class TestLLMAPIFailureHandling:
         mock_model_class.return_value = mock_model
         mock_model.generate_content.side_effect = Exception("API Error")
         
-        # Create LLM service with 3 retries
-        service = LLMService(api_key="test-key", max_retries=3)
+        service = LLMService(api_key="test-key", max_retries=max_retries)
         
-        # Call should fail after 3 attempts
+        # Call should fail after max_retries attempts
         result = service.batch_match_headers(["Test Header"], ["Power_Output"], ["TG"])
         
-        # Should have tried 3 times
-        assert mock_model.generate_content.call_count == 3
+        # Should have tried max_retries times, backing off between attempts
+        assert mock_model.generate_content.call_count == max_retries
+        assert mock_sleep.call_count == max_retries - 1
         
         # Should return unmapped header
         assert len(result) == 1
         assert result[0].method == MatchMethod.NONE
     
-    def test_matcher_handles_llm_failure_gracefully(self, registry):
+    def test_matcher_handles_llm_failure_gracefully(self, mock_model_class, mock_sleep, registry):
         """
         Test that HeaderMatcher handles LLM failures gracefully.
         
@@ -328,7 +297,8 @@ class TestPydanticValidationErrors:
         
         Requirements: 11.5
         """
-        mapping = HeaderMapping(
+        # Known-good helper; only the ParsedCell is under test
+        mapping = HeaderMapping.model_construct(
             original_header="Test",
             method=MatchMethod.EXACT,
             confidence=ConfidenceLevel.HIGH
@@ -363,7 +333,8 @@ class TestPydanticValidationErrors:
         
         Requirements: 11.5
         """
-        table_structure = TableStructure(
+        # Known-good helper; only the ParseResult is under test
+        table_structure = TableStructure.model_construct(
             header_row_index=1,
             data_start_row=2,
             column_count=3
@@ -381,50 +352,16 @@ class TestPydanticValidationErrors:
             )
 
 
-class TestCorruptedFileHandling:
-    """Test corrupted file handling."""
-    
-    def test_corrupted_excel_file_returns_400(self, client):
-        """
-        Test that corrupted Excel files return HTTP 400.
-        
-        Requirements: 11.1
-        """
-        # Create corrupted file (looks like zip but isn't valid Excel)
-        corrupted_file = BytesIO(b"PK\x03\x04corrupted data")
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("test.xlsx", corrupted_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-        )
-        
-        # Should return 400 or 500
-        assert response.status_code in [400, 500]
-        data = response.json()
-        assert "detail" in data
-    
-    def test_empty_file_returns_400(self, client):
-        """
-        Test that empty files return HTTP 400.
-        
-        Requirements: 11.1
-        """
-        empty_file = BytesIO(b"")
-        
-        response = client.post(
-            "/api/parse",
-            files={"file": ("test.xlsx", empty_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
-        )
-        
-        assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
-        assert "empty" in data["detail"].lower()
-
-
 class TestMatcherErrorHandling:
     """Test error handling in HeaderMatcher."""
     
+    @pytest.fixture
+    def failing_registry(self):
+        """Mock registry whose Tier 1 exact_match always raises."""
+        mock_registry = MagicMock(spec=RegistryManager)
+        mock_registry.exact_match.side_effect = Exception("Tier 1 Error")
+        return mock_registry
+    
     def test_matcher_with_empty_headers_list(self, registry, mock_llm_service):
         """
         Test that matcher handles empty headers list.
@@ -437,19 +374,18 @@ class TestMatcherErrorHandling:
         
         assert result == []
     
-    def test_matcher_tier1_exception_continues_to_tier2(self, registry, mock_llm_service):
+    def test_matcher_tier1_exception_continues_to_tier2(self, failing_registry, mock_llm_service):
         """
         Test that Tier 1 exceptions don't stop processing.
         
         Requirements: 11.1
         """
-        # Create matcher with mock registry that raises exception
-        mock_registry = MagicMock(spec=RegistryManager)
-        mock_registry.exact_match.side_effect = Exception("Tier 1 Error")
-        mock_registry.extract_asset.return_value = ("TG", "TG-1")
-        mock_registry.exact_match.side_effect = [Exception("Error"), "Power_Output"]
+        # Tier 1 raises on the header; Tier 2 finds the asset and its
+        # parameter inference lookup succeeds
+        failing_registry.exact_match.side_effect = [Exception("Error"), "Power_Output"]
+        failing_registry.extract_asset.return_value = ("TG", "TG-1")
         
-        matcher = HeaderMatcher(mock_registry, mock_llm_service)
+        matcher = HeaderMatcher(failing_registry, mock_llm_service)
         
         # Should not raise, should continue to Tier 2
         result = matcher.match_headers(["TG-1 Power"])
@@ -458,19 +394,17 @@ class TestMatcherErrorHandling:
         # Should have attempted Tier 2 or Tier 3
         assert result[0].method in [MatchMethod.FUZZY, MatchMethod.LLM, MatchMethod.NONE]
     
-    def test_matcher_critical_error_returns_unmapped(self, registry, mock_llm_service):
+    def test_matcher_critical_error_returns_unmapped(self, failing_registry, mock_llm_service):
         """
         Test that critical errors return unmapped headers.
         
         Requirements: 11.1
         """
         # Create matcher that will fail completely
-        mock_registry = MagicMock(spec=RegistryManager)
-        mock_registry.exact_match.side_effect = Exception("Critical Error")
-        mock_registry.extract_asset.side_effect = Exception("Critical Error")
+        failing_registry.extract_asset.side_effect = Exception("Critical Error")
         mock_llm_service.batch_match_headers.side_effect = Exception("Critical Error")
         
-        matcher = HeaderMatcher(mock_registry, mock_llm_service)
+        matcher = HeaderMatcher(failing_registry, mock_llm_service)
         
         # Should not raise, should return unmapped headers
         result = matcher.match_headers(["Test Header"])
@@ -483,20 +417,14 @@ class TestMatcherErrorHandling:
 class TestPreprocessorErrorHandling:
     """Test error handling in preprocessor."""
     
-    def test_find_header_row_with_corrupted_row(self, mock_llm_service):
+    def test_find_header_row_with_corrupted_row(self, mock_llm_service, header_row2_sheet):
         """
         Test that corrupted rows don't stop header detection.
         
         Requirements: 11.1
         """
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        
-        # Add valid header row
-        sheet['A2'] = 'Header1'
-        sheet['B2'] = 'Header2'
-        sheet['C2'] = 'Header3'
-        sheet['D2'] = 'Header4'
+        # Valid header row in row 2
+        sheet = header_row2_sheet
         
         # Should detect row 2 as header
         result = find_header_row(sheet, mock_llm_service)
@@ -504,20 +432,27 @@ class TestPreprocessorErrorHandling:
         assert result.header_row_index == 2
         assert result.data_start_row == 3
     
-    def test_find_header_row_with_merged_cell_error(self, mock_llm_service):
+    def test_find_header_row_skips_unreadable_row(self, mock_llm_service):
         """
-        Test that merged cell detection errors don't stop processing.
+        Test that a row whose read raises is skipped, not fatal.
         
         Requirements: 11.1
         """
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
+        sheet = _CorruptRowSheet(_header_sheet(3), bad_row=2)
+        
+        result = find_header_row(sheet, mock_llm_service)
+        
+        assert result.header_row_index == 3
+        assert result.data_start_row == 4
+    
+    def test_find_header_row_with_merged_cell_error(self, mock_llm_service, header_row1_sheet):
+        """
+        Test that merged cell detection errors don't stop processing.
         
-        # Add header row
-        sheet['A1'] = 'Header1'
-        sheet['B1'] = 'Header2'
-        sheet['C1'] = 'Header3'
-        sheet['D1'] = 'Header4'
+        Requirements: 11.1
+        """
+        # Header row in row 1
+        sheet = header_row1_sheet
         
         # Should still detect header even if merged cell detection fails
         result = find_header_row(sheet, mock_llm_service)
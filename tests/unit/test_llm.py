@@ -4,13 +4,108 @@ Tests specific examples and error handling.
 """
 
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 import json
 
-from app.services.llm import LLMService
+from app.services.llm import LLMService, count_api_calls
 from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
 
 
+# Canned LLM responses, serialized once at import and shared by the tests
+_POWER_PLANT_MAPPINGS_JSON = json.dumps([
+    {
+        "original_header": "Power TG1",
+        "matched_parameter": "Power_Output",
+        "matched_asset": "TG",
+        "method": "llm",
+        "confidence": "high",
+        "normalized_header": None
+    },
+    {
+        "original_header": "Temperature AFBC2",
+        "matched_parameter": "Temperature",
+        "matched_asset": "AFBC",
+        "method": "llm",
+        "confidence": "medium",
+        "normalized_header": None
+    },
+    {
+        "original_header": "Efficiency",
+        "matched_parameter": "Efficiency",
+        "matched_asset": None,
+        "method": "llm",
+        "confidence": "high",
+        "normalized_header": None
+    }
+])
+
+# Header1..Header3 mapped to param1..param3 with high, medium and low confidence
+_HEADER_MAPPINGS = [
+    {
+        "original_header": f"Header{i}",
+        "matched_parameter": f"param{i}",
+        "matched_asset": None,
+        "method": "llm",
+        "confidence": confidence,
+        "normalized_header": None
+    }
+    for i, confidence in enumerate(["high", "medium", "low"], start=1)
+]
+_THREE_MAPPINGS_JSON = json.dumps(_HEADER_MAPPINGS)
+_TWO_MAPPINGS_JSON = json.dumps(_HEADER_MAPPINGS[:2])
+_MEDIUM_MAPPING_JSON = json.dumps([{**_HEADER_MAPPINGS[0], "confidence": "medium"}])
+
+
+class FakeGenerativeModel:
+    """
+    Minimal stand-in for genai.GenerativeModel.
+    
+    Exposes only generate_content, returning a response with a fixed text or
+    raising a fixed exception, and records calls. Much cheaper than a
+    MagicMock, which builds child mocks on every attribute access.
+    """
+    
+    def __init__(self, text=None, exc=None):
+        self.text = text
+        self.exc = exc
+        self.calls = 0
+        self.last_kwargs = None
+    
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        self.last_kwargs = kwargs
+        if self.exc is not None:
+            raise self.exc
+        return SimpleNamespace(text=self.text)
+
+
+@pytest.fixture
+def fake_model():
+    """Fixture providing a fresh FakeGenerativeModel per test."""
+    return FakeGenerativeModel()
+
+
+@pytest.fixture(scope="module")
+def shared_llm_service():
+    """One LLMService for the module, so genai setup runs once."""
+    return LLMService(api_key="test_key")
+
+
+@pytest.fixture
+def llm_service(shared_llm_service, fake_model):
+    """The shared LLMService with a fresh fake model and per-test state reset."""
+    shared_llm_service.model = fake_model
+    shared_llm_service.max_retries = 3
+    shared_llm_service._cache.clear()
+    shared_llm_service._query_cache.clear()
+    shared_llm_service._consecutive_failures = 0
+    shared_llm_service._breaker_open_until = 0.0
+    return shared_llm_service
+
+
 class TestLLMServiceInitialization:
     """Test LLM service initialization"""
     
@@ -34,54 +129,17 @@ class TestLLMServiceInitialization:
 class TestBatchMatchHeaders:
     """Test batch_match_headers method"""
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_valid_response(self, mock_model_class):
+    def test_batch_match_headers_with_valid_response(self, llm_service, fake_model):
         """Test batch matching with valid LLM response"""
-        # Setup mock
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
-        
         headers = ["Power TG1", "Temperature AFBC2", "Efficiency"]
         parameters = ["Power_Output", "Temperature", "Efficiency"]
         assets = ["TG", "AFBC"]
         
         # Mock LLM response
-        mock_response_data = [
-            {
-                "original_header": "Power TG1",
-                "matched_parameter": "Power_Output",
-                "matched_asset": "TG",
-                "method": "llm",
-                "confidence": "high",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Temperature AFBC2",
-                "matched_parameter": "Temperature",
-                "matched_asset": "AFBC",
-                "method": "llm",
-                "confidence": "medium",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Efficiency",
-                "matched_parameter": "Efficiency",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "high",
-                "normalized_header": None
-            }
-        ]
-        
-        mock_response = MagicMock()
-        mock_response.text = json.dumps(mock_response_data)
-        mock_model.generate_content.return_value = mock_response
-        
-        # Create service and call method
-        service = LLMService(api_key="test_key")
-        service.model = mock_model
+        fake_model.text = _POWER_PLANT_MAPPINGS_JSON
         
-        result = service.batch_match_headers(headers, parameters, assets)
+        # Call method on the shared service
+        result = llm_service.batch_match_headers(headers, parameters, assets)
         
         # Verify results
         assert len(result) == 3
@@ -92,37 +150,33 @@ class TestBatchMatchHeaders:
         assert result[0].confidence == ConfidenceLevel.HIGH
         
         # Verify LLM was called once
-        assert mock_model.generate_content.call_count == 1
+        assert fake_model.calls == 1
+        
+        # Output is constrained to the mapping array schema
+        config = fake_model.last_kwargs["generation_config"]
+        assert config.response_mime_type == "application/json"
+        assert config.response_schema["type"] == "array"
+        assert set(config.response_schema["items"]["required"]) == {
+            "original_header", "method", "confidence"
+        }
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_empty_list(self, mock_model_class):
+    def test_batch_match_headers_with_empty_list(self, llm_service, fake_model):
         """Test batch matching with empty headers list"""
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
-        
-        service = LLMService(api_key="test_key")
-        service.model = mock_model
-        
-        result = service.batch_match_headers([], ["param1"], ["asset1"])
+        result = llm_service.batch_match_headers([], ["param1"], ["asset1"])
         
         # Should return empty list without calling LLM
         assert result == []
-        assert mock_model.generate_content.call_count == 0
+        assert fake_model.calls == 0
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_api_failure(self, mock_model_class):
+    def test_batch_match_headers_with_api_failure(self, llm_service, fake_model):
         """Test batch matching when LLM API fails"""
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
-        
         # Mock API failure
-        mock_model.generate_content.side_effect = Exception("API Error")
+        fake_model.exc = Exception("API Error")
         
-        service = LLMService(api_key="test_key", max_retries=2)
-        service.model = mock_model
+        llm_service.max_retries = 2
         
         headers = ["Header1", "Header2"]
-        result = service.batch_match_headers(headers, ["param1"], ["asset1"])
+        result = llm_service.batch_match_headers(headers, ["param1"], ["asset1"])
         
         # Should return unmapped headers with method=NONE
         assert len(result) == 2
@@ -132,66 +186,90 @@ class TestBatchMatchHeaders:
         assert all(m.matched_asset is None for m in result)
         
         # Verify retries were attempted
-        assert mock_model.generate_content.call_count == 2
+        assert fake_model.calls == 2
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_invalid_json_response(self, mock_model_class):
+    def test_batch_match_headers_with_invalid_json_response(self, llm_service, fake_model):
         """Test batch matching when LLM returns invalid JSON"""
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
-        
         # Mock invalid JSON response
-        mock_response = MagicMock()
-        mock_response.text = "This is not valid JSON"
-        mock_model.generate_content.return_value = mock_response
-        
-        service = LLMService(api_key="test_key")
-        service.model = mock_model
+        fake_model.text = "This is not valid JSON"
         
         headers = ["Header1", "Header2"]
-        result = service.batch_match_headers(headers, ["param1"], ["asset1"])
+        result = llm_service.batch_match_headers(headers, ["param1"], ["asset1"])
         
         # Should return unmapped headers on parsing failure
         assert len(result) == 2
         assert all(m.method == MatchMethod.NONE for m in result)
         assert all(m.confidence == ConfidenceLevel.LOW for m in result)
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_fewer_mappings_than_headers(self, mock_model_class):
-        """Test batch matching when LLM returns fewer mappings than headers"""
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
+    @pytest.mark.parametrize("response_text", [
+        pytest.param(
+            '[{"original_header": "Header1", "matched_parameter": "param1", '
+            '"method": "llm", "confidence": "high"},]',
+            id="trailing-comma",
+        ),
+        pytest.param(
+            '```json\n[{"original_header": "Header1", "matched_parameter": "param1", '
+            '"method": "llm", "confidence": "high"}]\n```',
+            id="code-fence",
+        ),
+    ])
+    def test_batch_match_headers_recovers_near_miss_json(self, llm_service, fake_model, response_text):
+        """Test that slightly malformed JSON is repaired instead of discarded"""
+        fake_model.text = response_text
+        
+        result = llm_service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        
+        assert len(result) == 1
+        assert result[0].method == MatchMethod.LLM
+        assert result[0].matched_parameter == "param1"
+        assert result[0].confidence == ConfidenceLevel.HIGH
+    
+    def test_batch_match_headers_fills_gaps_in_sparse_mappings(self, llm_service, fake_model):
+        """Test that missing or blank fields fall back instead of failing the batch"""
+        fake_model.text = json.dumps([
+            {"original_header": "", "matched_parameter": "param1", "method": "llm"},
+            {"original_header": "Header2", "matched_parameter": "  ", "method": "llm", "confidence": "low"}
+        ])
         
-        headers = ["Header1", "Header2", "Header3"]
+        result = llm_service.batch_match_headers(["Header1", "Header2"], ["param1"], ["asset1"])
         
-        # Mock response with only 2 mappings
-        mock_response_data = [
-            {
-                "original_header": "Header1",
-                "matched_parameter": "param1",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "high",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Header2",
-                "matched_parameter": "param2",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "medium",
-                "normalized_header": None
-            }
-        ]
+        # Blank original_header is taken from the input, missing confidence is MEDIUM
+        assert result[0].original_header == "Header1"
+        assert result[0].matched_parameter == "param1"
+        assert result[0].confidence == ConfidenceLevel.MEDIUM
+        # Blank matched fields become None
+        assert result[1].matched_parameter is None
+        assert result[1].confidence == ConfidenceLevel.LOW
+        assert all(m.method == MatchMethod.LLM for m in result)
+    
+    def test_batch_match_headers_with_unknown_confidence(self, llm_service, fake_model):
+        """Test that an unrecognised confidence value maps every header to NONE"""
+        fake_model.text = json.dumps([
+            {"original_header": "Header1", "matched_parameter": "param1", "method": "llm", "confidence": "certain"}
+        ])
         
-        mock_response = MagicMock()
-        mock_response.text = json.dumps(mock_response_data)
-        mock_model.generate_content.return_value = mock_response
+        result = llm_service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
         
-        service = LLMService(api_key="test_key")
-        service.model = mock_model
+        assert result[0].method == MatchMethod.NONE
+        assert result[0].confidence == ConfidenceLevel.LOW
+    
+    def test_batch_match_headers_with_non_array_response(self, llm_service, fake_model):
+        """Test that a JSON value that is not an array of objects maps every header to NONE"""
+        fake_model.text = json.dumps({"original_header": "Header1"})
+        
+        result = llm_service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        
+        assert result[0].method == MatchMethod.NONE
+        assert result[0].confidence == ConfidenceLevel.LOW
+    
+    def test_batch_match_headers_with_fewer_mappings_than_headers(self, llm_service, fake_model):
+        """Test batch matching when LLM returns fewer mappings than headers"""
+        headers = ["Header1", "Header2", "Header3"]
+        
+        # Mock response with only 2 mappings
+        fake_model.text = _TWO_MAPPINGS_JSON
         
-        result = service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
+        result = llm_service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
         
         # Should fill in missing mappings with NONE
         assert len(result) == 3
@@ -200,55 +278,110 @@ class TestBatchMatchHeaders:
         assert result[2].method == MatchMethod.NONE
         assert result[2].confidence == ConfidenceLevel.LOW
     
-    @patch('app.services.llm.genai.GenerativeModel')
-    def test_batch_match_headers_with_more_mappings_than_headers(self, mock_model_class):
+    def test_batch_match_headers_with_more_mappings_than_headers(self, llm_service, fake_model):
         """Test batch matching when LLM returns more mappings than headers"""
-        mock_model = MagicMock()
-        mock_model_class.return_value = mock_model
-        
         headers = ["Header1", "Header2"]
         
         # Mock response with 3 mappings (more than headers)
-        mock_response_data = [
-            {
-                "original_header": "Header1",
-                "matched_parameter": "param1",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "high",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Header2",
-                "matched_parameter": "param2",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "medium",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Header3",
-                "matched_parameter": "param3",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "low",
-                "normalized_header": None
-            }
-        ]
+        fake_model.text = _THREE_MAPPINGS_JSON
+        
+        result = llm_service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
+        
+        # Should only return mappings for requested headers
+        assert len(result) == 2
+        assert result[0].original_header == "Header1"
+        assert result[1].original_header == "Header2"
+
+
+class TestResponseCache:
+    """Test the in-process batch response cache"""
+    
+    @patch('app.services.llm.genai.GenerativeModel')
+    def test_repeated_batch_served_from_cache(self, mock_model_class):
+        """Test that an identical batch does not call the LLM twice"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
         
         mock_response = MagicMock()
-        mock_response.text = json.dumps(mock_response_data)
+        mock_response.text = json.dumps([{
+            "original_header": "Header1",
+            "matched_parameter": "param1",
+            "matched_asset": None,
+            "method": "llm",
+            "confidence": "high",
+            "normalized_header": None
+        }])
         mock_model.generate_content.return_value = mock_response
         
         service = LLMService(api_key="test_key")
         service.model = mock_model
         
-        result = service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
+        first = service.batch_match_headers(["Header1"], ["param1", "param2"], ["asset1"])
+        # Registry order does not affect the cache key
+        second = service.batch_match_headers(["Header1"], ["param2", "param1"], ["asset1"])
         
-        # Should only return mappings for requested headers
-        assert len(result) == 2
-        assert result[0].original_header == "Header1"
-        assert result[1].original_header == "Header2"
+        assert mock_model.generate_content.call_count == 1
+        assert second == first
+        # Callers get their own copies
+        assert second[0] is not first[0]
+    
+    @patch('app.services.llm.genai.GenerativeModel')
+    def test_failed_batch_not_cached(self, mock_model_class):
+        """Test that fallback results after an API failure are not cached"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
+        mock_model.generate_content.side_effect = Exception("API Error")
+        
+        service = LLMService(api_key="test_key", max_retries=1)
+        service.model = mock_model
+        
+        service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        
+        assert mock_model.generate_content.call_count == 2
+    
+    @patch('app.services.llm.genai.GenerativeModel')
+    def test_cache_disabled_with_zero_size(self, mock_model_class):
+        """Test that cache_size=0 sends every batch to the LLM"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
+        
+        mock_response = MagicMock()
+        mock_response.text = "[]"
+        mock_model.generate_content.return_value = mock_response
+        
+        service = LLMService(api_key="test_key", cache_size=0)
+        service.model = mock_model
+        
+        service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        
+        assert mock_model.generate_content.call_count == 2
+    
+    def test_short_response_not_cached(self, llm_service, fake_model):
+        """Test that a response missing some headers is sent again next time"""
+        headers = ["Header1", "Header2", "Header3"]
+        fake_model.text = _TWO_MAPPINGS_JSON
+        
+        llm_service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
+        fake_model.text = _THREE_MAPPINGS_JSON
+        result = llm_service.batch_match_headers(headers, ["param1", "param2"], ["asset1"])
+        
+        assert fake_model.calls == 2
+        assert result[2].method == MatchMethod.LLM
+    
+    def test_cached_batch_not_counted_as_api_call(self, llm_service, fake_model):
+        """Test that count_api_calls counts only requests sent to Gemini"""
+        fake_model.text = _MEDIUM_MAPPING_JSON
+        
+        with count_api_calls() as first:
+            llm_service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        with count_api_calls() as second:
+            llm_service.batch_match_headers(["Header1"], ["param1"], ["asset1"])
+        
+        assert first.value == 1
+        assert second.value == 0
+        assert fake_model.calls == 1
 
 
 class TestSimpleQuery:
@@ -289,14 +422,39 @@ class TestSimpleQuery:
         assert result == ""
         assert mock_model.generate_content.call_count == 2
 
+    
+    def test_repeated_query_served_from_cache(self, llm_service, fake_model):
+        """Test that an identical prompt does not call the LLM twice"""
+        fake_model.text = "3"
+        
+        assert llm_service.simple_query("Which row is the header?") == "3"
+        assert llm_service.simple_query("Which row is the header?") == "3"
+        assert fake_model.calls == 1
+        
+        # A different preview is a different prompt
+        assert llm_service.simple_query("Which row is the header? Row 1: ()") == "3"
+        assert fake_model.calls == 2
+    
+    def test_failed_query_not_cached(self, llm_service, fake_model):
+        """Test that a failed query is retried on the next call"""
+        llm_service.max_retries = 1
+        fake_model.exc = Exception("API Error")
+        
+        assert llm_service.simple_query("Test prompt") == ""
+        
+        fake_model.exc = None
+        fake_model.text = "2"
+        assert llm_service.simple_query("Test prompt") == "2"
+        assert fake_model.calls == 2
 
 class TestRetryLogic:
-    """Test retry logic with exponential backoff"""
+    """Test retry logic with jittered exponential backoff and circuit breaker"""
     
+    @patch('app.services.llm.random.uniform', side_effect=lambda low, high: high)
     @patch('app.services.llm.time.sleep')
     @patch('app.services.llm.genai.GenerativeModel')
-    def test_retry_with_exponential_backoff(self, mock_model_class, mock_sleep):
-        """Test that retries use exponential backoff"""
+    def test_retry_with_exponential_backoff(self, mock_model_class, mock_sleep, mock_uniform):
+        """Test that retries use jittered exponential backoff"""
         mock_model = MagicMock()
         mock_model_class.return_value = mock_model
         
@@ -316,10 +474,14 @@ class TestRetryLogic:
         assert result == "Success"
         assert mock_model.generate_content.call_count == 3
         
-        # Verify exponential backoff: 1s, 2s
+        # Verify full-jitter bounds double per attempt: [0, 1s], [0, 2s]
+        mock_uniform.assert_any_call(0, 1)  # 2^0 = 1
+        mock_uniform.assert_any_call(0, 2)  # 2^1 = 2
+        
+        # Sleeps use the jittered value (pinned to the upper bound here)
         assert mock_sleep.call_count == 2
-        mock_sleep.assert_any_call(1)  # 2^0 = 1
-        mock_sleep.assert_any_call(2)  # 2^1 = 2
+        mock_sleep.assert_any_call(1)
+        mock_sleep.assert_any_call(2)
     
     @patch('app.services.llm.time.sleep')
     @patch('app.services.llm.genai.GenerativeModel')
@@ -340,6 +502,70 @@ class TestRetryLogic:
         assert result == "Success"
         assert mock_model.generate_content.call_count == 1
         assert mock_sleep.call_count == 0
+    
+    @patch('app.services.llm.time.sleep')
+    @patch('app.services.llm.genai.GenerativeModel')
+    def test_circuit_breaker_opens_after_consecutive_failures(self, mock_model_class, mock_sleep):
+        """Test that repeated exhausted calls open the breaker and fail fast"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
+        mock_model.generate_content.side_effect = Exception("API Error")
+        
+        service = LLMService(api_key="test_key", max_retries=1, breaker_threshold=2)
+        service.model = mock_model
+        
+        assert service.simple_query("Test prompt") == ""
+        assert service.simple_query("Test prompt") == ""
+        assert mock_model.generate_content.call_count == 2
+        
+        # Breaker is open: no further API calls until the cooldown elapses
+        assert service.simple_query("Test prompt") == ""
+        assert mock_model.generate_content.call_count == 2
+    
+    def test_circuit_breaker_counts_concurrent_failures(self):
+        """Test that failures on concurrent threads are all counted"""
+        threads = 8
+        barrier = threading.Barrier(threads)
+        
+        class BarrierModel:
+            """Fails every call once all threads are inside generate_content."""
+            
+            def generate_content(self, prompt, **kwargs):
+                barrier.wait(timeout=5)
+                raise Exception("API Error")
+        
+        service = LLMService(api_key="test_key", max_retries=1, breaker_threshold=threads)
+        service.model = BarrierModel()
+        
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(service.simple_query, ["Test prompt"] * threads))
+        
+        assert results == [""] * threads
+        assert service.api_calls_made == threads
+        assert service._consecutive_failures == threads
+        # The last failure reached the threshold and opened the breaker
+        assert service.simple_query("Test prompt") == ""
+        assert service.api_calls_made == threads
+    
+    @patch('app.services.llm.time.sleep')
+    @patch('app.services.llm.genai.GenerativeModel')
+    def test_circuit_breaker_closes_after_cooldown(self, mock_model_class, mock_sleep):
+        """Test that calls resume once the breaker cooldown has elapsed"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
+        mock_model.generate_content.side_effect = [
+            Exception("API Error"),
+            MagicMock(text="Success")
+        ]
+        
+        service = LLMService(
+            api_key="test_key", max_retries=1, breaker_threshold=1, breaker_cooldown=0.0
+        )
+        service.model = mock_model
+        
+        assert service.simple_query("Test prompt") == ""
+        assert service.simple_query("Test prompt") == "Success"
+        assert service._consecutive_failures == 0
 
 
 class TestBuildBatchMatchPrompt:
@@ -366,6 +592,19 @@ class TestBuildBatchMatchPrompt:
         assert "1. Header1" in prompt
         assert "2. Header2" in prompt
         assert "exactly 2 mappings" in prompt
+    
+    def test_build_batch_match_prompt_shares_registry_prefix(self):
+        """Test that batches with different headers share the same prompt prefix"""
+        service = LLMService(api_key="test_key")
+        
+        first = service._build_batch_match_prompt(["Header1"], ["Temperature", "Power_Output"], ["TG", "AFBC"])
+        second = service._build_batch_match_prompt(["Other1", "Other2"], ["Power_Output", "Temperature"], ["AFBC", "TG"])
+        
+        # Everything up to the header list is identical regardless of headers
+        # or registry order
+        prefix = first[:first.index("UNMAPPED HEADERS:")]
+        assert second.startswith(prefix)
+        assert "Return a JSON array" in prefix
 
 
 class TestConfidenceHandling:
@@ -378,19 +617,8 @@ class TestConfidenceHandling:
         mock_model_class.return_value = mock_model
         
         # Mock response without explicit confidence (will use default)
-        mock_response_data = [
-            {
-                "original_header": "Header1",
-                "matched_parameter": "param1",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "medium",  # Explicitly set to medium
-                "normalized_header": None
-            }
-        ]
-        
         mock_response = MagicMock()
-        mock_response.text = json.dumps(mock_response_data)
+        mock_response.text = _MEDIUM_MAPPING_JSON
         mock_model.generate_content.return_value = mock_response
         
         service = LLMService(api_key="test_key")
@@ -407,35 +635,8 @@ class TestConfidenceHandling:
         mock_model = MagicMock()
         mock_model_class.return_value = mock_model
         
-        mock_response_data = [
-            {
-                "original_header": "Header1",
-                "matched_parameter": "param1",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "high",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Header2",
-                "matched_parameter": "param2",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "medium",
-                "normalized_header": None
-            },
-            {
-                "original_header": "Header3",
-                "matched_parameter": "param3",
-                "matched_asset": None,
-                "method": "llm",
-                "confidence": "low",
-                "normalized_header": None
-            }
-        ]
-        
         mock_response = MagicMock()
-        mock_response.text = json.dumps(mock_response_data)
+        mock_response.text = _THREE_MAPPINGS_JSON
         mock_model.generate_content.return_value = mock_response
         
         service = LLMService(api_key="test_key")
@@ -84,6 +84,35 @@ class TestParseValue:
         assert parse_value(123.45) == 123.45
         assert parse_value(0) == 0.0
     
+    def test_numeric_types_skip_string_form(self):
+        """Test that numeric cells parse directly rather than via their repr"""
+        assert parse_value(1e-05) == 1e-05
+        assert parse_value(-2.5e20) == -2.5e20
+        assert parse_value(True) == "True"
+    
+    def test_repeated_strings_served_from_cache(self):
+        """Test that repeated string values are parsed once and cached"""
+        from app.core.parser import _parse_text
+        
+        parse_value.cache_clear()
+        assert [parse_value("YES") for _ in range(5)] == [1.0] * 5
+        info = _parse_text.cache_info()
+        assert info.misses == 1
+        assert info.hits == 4
+    
+    def test_long_strings_bypass_cache(self):
+        """Test that long free-text values are parsed without being cached"""
+        from app.core.parser import _parse_text
+        
+        parse_value.cache_clear()
+        note = "Unit tripped on high drum level " * 4
+        assert parse_value(note) == note.strip()
+        assert _parse_text.cache_info().currsize == 0
+    
+    def test_unhashable_values_bypass_cache(self):
+        """Test that unhashable values still parse through their string form"""
+        assert parse_value(["a", 1]) == "['a', 1]"
+    
     def test_percentage_with_commas(self):
         """Test percentages with comma separators"""
         assert parse_value("1,234%") == 12.34
@@ -249,6 +278,7 @@ class TestParseRow:
     
     def test_parse_row_more_values_than_mappings(self):
         """Test row parsing when there are more values than mappings"""
+        from pydantic import ValidationError
         from app.core.parser import parse_row
         from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
         
@@ -272,6 +302,15 @@ class TestParseRow:
         assert parsed_cells[1].header_mapping.method == MatchMethod.NONE
         assert parsed_cells[2].parsed_value == 789.0
         assert parsed_cells[2].header_mapping.original_header == "Column_2"
+        
+        # Default mappings are shared across rows
+        next_row = parse_row(row_values, mappings, row_index=3)
+        assert next_row[1].header_mapping is parsed_cells[1].header_mapping
+        
+        # Shared mappings are frozen, so no caller can change them for later rows
+        with pytest.raises(ValidationError):
+            parsed_cells[1].header_mapping.matched_parameter = "Power_Output"
+        assert next_row[1].header_mapping.matched_parameter is None
     
     def test_parse_row_preserves_audit_trail(self):
         """Test that parse_row preserves complete audit trail"""
@@ -325,3 +364,70 @@ class TestParseRow:
         
         # Should use default value of 0
         assert parsed_cells[0].row_index == 0
+    
+    def test_parse_row_rejects_negative_row_index(self):
+        """Test that a negative row_index is rejected as ParsedCell would"""
+        from app.core.parser import parse_row
+        from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
+        
+        mappings = [
+            HeaderMapping(
+                original_header="Col1",
+                method=MatchMethod.EXACT,
+                confidence=ConfidenceLevel.HIGH
+            )
+        ]
+        
+        with pytest.raises(ValueError, match="non-negative"):
+            parse_row(["123"], mappings, row_index=-1)
+    
+    def test_parse_row_cells_validate_in_parse_result(self):
+        """Test that constructed cells are accepted by ParseResult at the API boundary"""
+        from app.core.parser import parse_row
+        from app.schema.models import (
+            HeaderMapping, MatchMethod, ConfidenceLevel, ParseResult, TableStructure
+        )
+        
+        mappings = [
+            HeaderMapping(
+                original_header="Col1",
+                method=MatchMethod.EXACT,
+                confidence=ConfidenceLevel.HIGH
+            )
+        ]
+        
+        row = parse_row(["1,234", "extra"], mappings, row_index=2)
+        result = ParseResult(
+            file_name="sheet.xlsx",
+            table_structure=TableStructure(header_row_index=1, data_start_row=2, column_count=1),
+            header_mappings=mappings,
+            parsed_data=[row],
+            total_cells=2,
+            successful_parses=2,
+            llm_calls_made=0
+        )
+        
+        dumped = result.model_dump()["parsed_data"][0]
+        assert dumped[0]["parsed_value"] == 1234.0
+        assert dumped[1]["header_mapping"]["original_header"] == "Column_1"
+    
+    def test_parse_sheet_matches_parse_row(self):
+        """Test that parse_sheet parses each row as parse_row with consecutive indices"""
+        from app.core.parser import parse_row, parse_sheet
+        from app.schema.models import HeaderMapping, MatchMethod, ConfidenceLevel
+        
+        mappings = [
+            HeaderMapping(
+                original_header="Col1",
+                method=MatchMethod.EXACT,
+                confidence=ConfidenceLevel.HIGH
+            )
+        ]
+        
+        rows = [("1,234", "YES"), ("N/A",), ("45%", None)]
+        parsed_rows = parse_sheet(iter(rows), mappings, start_row=4)
+        
+        assert len(parsed_rows) == 3
+        for offset, (row_values, parsed_cells) in enumerate(zip(rows, parsed_rows)):
+            assert parsed_cells == parse_row(row_values, mappings, row_index=4 + offset)
+        assert parse_sheet(iter([]), mappings, start_row=2) == []
@@ -4,7 +4,8 @@ Tests specific examples and edge cases for header row detection and merged cell
 """
 
 import pytest
-from openpyxl import Workbook
+from io import BytesIO
+from openpyxl import Workbook, load_workbook
 from unittest.mock import Mock, MagicMock
 from app.core.preprocessor import find_header_row, _llm_detect_header_row
 from app.schema.models import TableStructure
@@ -20,14 +21,11 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Add header row at row 1 with 5 string values
-        headers = ["Power_Output", "Temperature", "Efficiency", "Status", "Notes"]
-        for col_idx, header in enumerate(headers, start=1):
-            sheet.cell(row=1, column=col_idx, value=header)
+        sheet.append(["Power_Output", "Temperature", "Efficiency", "Status", "Notes"])
         
         # Add data rows
         for row_idx in range(2, 5):
-            for col_idx in range(1, 6):
-                sheet.cell(row=row_idx, column=col_idx, value=row_idx * col_idx)
+            sheet.append([row_idx * col_idx for col_idx in range(1, 6)])
         
         # Detect header row
         result = find_header_row(sheet)
@@ -44,18 +42,15 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Add title rows with few strings
-        sheet.cell(row=1, column=1, value="Report Title")
-        sheet.cell(row=2, column=1, value="Date: 2024-01-01")
+        sheet.append(["Report Title"])
+        sheet.append(["Date: 2024-01-01"])
         
         # Add header row at row 3 with many strings
-        headers = ["Asset", "Parameter", "Value", "Unit", "Timestamp"]
-        for col_idx, header in enumerate(headers, start=1):
-            sheet.cell(row=3, column=col_idx, value=header)
+        sheet.append(["Asset", "Parameter", "Value", "Unit", "Timestamp"])
         
         # Add data rows
         for row_idx in range(4, 7):
-            for col_idx in range(1, 6):
-                sheet.cell(row=row_idx, column=col_idx, value=row_idx * 10)
+            sheet.append([row_idx * 10] * 5)
         
         # Detect header row
         result = find_header_row(sheet)
@@ -70,16 +65,13 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Row 1: 4 strings
-        for col_idx in range(1, 5):
-            sheet.cell(row=1, column=col_idx, value=f"String_{col_idx}")
+        sheet.append([f"String_{col_idx}" for col_idx in range(1, 5)])
         
         # Row 2: 6 strings (should be selected)
-        for col_idx in range(1, 7):
-            sheet.cell(row=2, column=col_idx, value=f"Header_{col_idx}")
+        sheet.append([f"Header_{col_idx}" for col_idx in range(1, 7)])
         
         # Row 3: 5 strings
-        for col_idx in range(1, 6):
-            sheet.cell(row=3, column=col_idx, value=f"Text_{col_idx}")
+        sheet.append([f"Text_{col_idx}" for col_idx in range(1, 6)])
         
         # Detect header row
         result = find_header_row(sheet)
@@ -94,8 +86,7 @@ class TestFindHeaderRow:
         
         # Add rows with only numeric data (no strings)
         for row_idx in range(1, 5):
-            for col_idx in range(1, 6):
-                sheet.cell(row=row_idx, column=col_idx, value=row_idx * col_idx)
+            sheet.append([row_idx * col_idx for col_idx in range(1, 6)])
         
         # Detect header row (without LLM service)
         result = find_header_row(sheet, llm_service=None)
@@ -109,8 +100,7 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Add header row
-        for col_idx in range(1, 6):
-            sheet.cell(row=1, column=col_idx, value=f"Header_{col_idx}")
+        sheet.append([f"Header_{col_idx}" for col_idx in range(1, 6)])
         
         # Merge cells A2:B3
         sheet.merge_cells(start_row=2, start_column=1, end_row=3, end_column=2)
@@ -145,8 +135,7 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Add header row
-        for col_idx in range(1, 4):
-            sheet.cell(row=1, column=col_idx, value=f"Col_{col_idx}")
+        sheet.append([f"Col_{col_idx}" for col_idx in range(1, 4)])
         
         # Detect table structure
         result = find_header_row(sheet)
@@ -159,15 +148,10 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Row 1: Mix of strings and numbers (only 2 strings)
-        sheet.cell(row=1, column=1, value="Title")
-        sheet.cell(row=1, column=2, value=123)
-        sheet.cell(row=1, column=3, value=456)
-        sheet.cell(row=1, column=4, value="Date")
+        sheet.append(["Title", 123, 456, "Date"])
         
         # Row 2: Many strings (should be selected)
-        headers = ["Asset", "Parameter", "Value", "Unit", "Status"]
-        for col_idx, header in enumerate(headers, start=1):
-            sheet.cell(row=2, column=col_idx, value=header)
+        sheet.append(["Asset", "Parameter", "Value", "Unit", "Status"])
         
         # Detect header row
         result = find_header_row(sheet)
@@ -180,13 +164,8 @@ class TestFindHeaderRow:
         wb = Workbook()
         sheet = wb.active
         
-        # Header row with some empty cells
-        sheet.cell(row=1, column=1, value="Col1")
-        sheet.cell(row=1, column=2, value="Col2")
-        # Column 3 is empty
-        sheet.cell(row=1, column=4, value="Col4")
-        sheet.cell(row=1, column=5, value="Col5")
-        sheet.cell(row=1, column=6, value="Col6")
+        # Header row with some empty cells (column 3 is empty)
+        sheet.append(["Col1", "Col2", None, "Col4", "Col5", "Col6"])
         
         # Detect header row (still has >3 strings)
         result = find_header_row(sheet)
@@ -200,14 +179,10 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Row 1: Whitespace-only strings (should not be counted)
-        sheet.cell(row=1, column=1, value="   ")
-        sheet.cell(row=1, column=2, value="\t")
-        sheet.cell(row=1, column=3, value="")
+        sheet.append(["   ", "\t", ""])
         
         # Row 2: Valid strings (should be selected)
-        headers = ["Header1", "Header2", "Header3", "Header4"]
-        for col_idx, header in enumerate(headers, start=1):
-            sheet.cell(row=2, column=col_idx, value=header)
+        sheet.append(["Header1", "Header2", "Header3", "Header4"])
         
         # Detect header row
         result = find_header_row(sheet)
@@ -221,14 +196,71 @@ class TestFindHeaderRow:
         sheet = wb.active
         
         # Add header row with 8 columns
-        for col_idx in range(1, 9):
-            sheet.cell(row=1, column=col_idx, value=f"Col_{col_idx}")
+        sheet.append([f"Col_{col_idx}" for col_idx in range(1, 9)])
         
         # Detect table structure
         result = find_header_row(sheet)
         
         assert result.column_count == 8
         assert result.column_count == sheet.max_column
+    
+    def test_strong_header_stops_scan(self):
+        """Test that a wide header followed by data rows ends the scan early"""
+        wb = Workbook()
+        sheet = wb.active
+        
+        # Row 1: 8 strings, row 2: numeric data (sharp drop)
+        sheet.append([f"Header_{col_idx}" for col_idx in range(1, 9)])
+        sheet.append(list(range(1, 9)))
+        
+        # Row 3: a wider text row that a full scan would have preferred
+        sheet.append([f"Note_{col_idx}" for col_idx in range(1, 11)])
+        
+        result = find_header_row(sheet)
+        
+        assert result.header_row_index == 1
+        assert result.data_start_row == 2
+    
+    def test_weak_header_keeps_scanning(self):
+        """Test that a header below the strong threshold does not stop the scan"""
+        wb = Workbook()
+        sheet = wb.active
+        
+        # Row 1: 5 strings followed by a data row, row 3: 7 strings
+        sheet.append([f"Header_{col_idx}" for col_idx in range(1, 6)])
+        sheet.append(list(range(1, 6)))
+        sheet.append([f"Label_{col_idx}" for col_idx in range(1, 8)])
+        
+        result = find_header_row(sheet)
+        
+        assert result.header_row_index == 3
+    
+    def test_read_only_worksheet(self):
+        """Test detection on a worksheet loaded in read-only streaming mode"""
+        wb = Workbook()
+        sheet = wb.active
+        sheet.append(["Title"])
+        sheet.append(["Asset", "Parameter", "Value", "Unit", "Timestamp"])
+        sheet.append([1, 2, 3, 4, 5])
+        sheet.merge_cells("A4:B4")
+        
+        buffer = BytesIO()
+        wb.save(buffer)
+        read_only_sheet = load_workbook(BytesIO(buffer.getvalue()), read_only=True).active
+        
+        result = find_header_row(read_only_sheet)
+        
+        assert result.header_row_index == 2
+        assert result.column_count == 5
+        # Read-only worksheets do not load merge records
+        assert result.merged_cells == []
+        
+        # Without a dimension record the width comes from the scanned rows
+        read_only_sheet.reset_dimensions()
+        result = find_header_row(read_only_sheet)
+        
+        assert result.header_row_index == 2
+        assert result.column_count == 5
 
 
 class TestLLMDetectHeaderRow:
@@ -241,8 +273,7 @@ class TestLLMDetectHeaderRow:
         
         # Add some rows
         for row_idx in range(1, 6):
-            for col_idx in range(1, 4):
-                sheet.cell(row=row_idx, column=col_idx, value=f"R{row_idx}C{col_idx}")
+            sheet.append([f"R{row_idx}C{col_idx}" for col_idx in range(1, 4)])
         
         # Mock LLM service
         mock_llm = Mock(spec=LLMService)
@@ -261,8 +292,7 @@ class TestLLMDetectHeaderRow:
         
         # Add some rows
         for row_idx in range(1, 4):
-            for col_idx in range(1, 3):
-                sheet.cell(row=row_idx, column=col_idx, value=f"Data_{row_idx}_{col_idx}")
+            sheet.append([f"Data_{row_idx}_{col_idx}" for col_idx in range(1, 3)])
         
         # Mock LLM service with whitespace in response
         mock_llm = Mock(spec=LLMService)
@@ -280,7 +310,7 @@ class TestLLMDetectHeaderRow:
         
         # Add some rows
         for row_idx in range(1, 4):
-            sheet.cell(row=row_idx, column=1, value=f"Row_{row_idx}")
+            sheet.append([f"Row_{row_idx}"])
         
         # Mock LLM service with invalid response
         mock_llm = Mock(spec=LLMService)
@@ -297,7 +327,7 @@ class TestLLMDetectHeaderRow:
         
         # Add some rows
         for row_idx in range(1, 3):
-            sheet.cell(row=row_idx, column=1, value=f"Data_{row_idx}")
+            sheet.append([f"Data_{row_idx}"])
         
         # Mock LLM service with empty response
         mock_llm = Mock(spec=LLMService)
@@ -313,10 +343,9 @@ class TestLLMDetectHeaderRow:
         sheet = wb.active
         
         # Add specific data
-        sheet.cell(row=1, column=1, value="Title")
-        sheet.cell(row=2, column=1, value="Header1")
-        sheet.cell(row=2, column=2, value="Header2")
-        sheet.cell(row=3, column=1, value=123)
+        sheet.append(["Title"])
+        sheet.append(["Header1", "Header2"])
+        sheet.append([123])
         
         # Mock LLM service
         mock_llm = Mock(spec=LLMService)
@@ -8,151 +8,82 @@ Requirements: 2.1, 2.2
 """
 
 import pytest
-from app.registry.data import RegistryManager
 
 
-@pytest.fixture
-def registry():
-    """Fixture providing a RegistryManager instance."""
-    return RegistryManager()
+# exact_match with known parameters
 
 
-class TestExactMatch:
-    """Unit tests for exact_match with known parameters."""
-    
-    def test_exact_match_power_output(self, registry):
-        """Test exact match for Power_Output parameter."""
-        result = registry.exact_match("Power_Output")
-        assert result == "Power_Output"
-    
-    def test_exact_match_temperature(self, registry):
-        """Test exact match for Temperature parameter."""
-        result = registry.exact_match("Temperature")
-        assert result == "Temperature"
-    
-    def test_exact_match_efficiency(self, registry):
-        """Test exact match for Efficiency parameter."""
-        result = registry.exact_match("Efficiency")
-        assert result == "Efficiency"
-    
-    def test_exact_match_case_insensitive(self, registry):
-        """Test exact match is case insensitive."""
-        result = registry.exact_match("POWER_OUTPUT")
-        assert result == "Power_Output"
-    
-    def test_exact_match_with_spaces(self, registry):
-        """Test exact match handles spaces."""
-        result = registry.exact_match("Power Output")
-        assert result == "Power_Output"
-    
-    def test_exact_match_with_hyphens(self, registry):
-        """Test exact match handles hyphens."""
-        result = registry.exact_match("Power-Output")
-        assert result == "Power_Output"
-    
-    def test_exact_match_with_whitespace(self, registry):
-        """Test exact match handles leading/trailing whitespace."""
-        result = registry.exact_match("  Power_Output  ")
-        assert result == "Power_Output"
-    
-    def test_exact_match_unknown_parameter(self, registry):
-        """Test exact match returns None for unknown parameter."""
-        result = registry.exact_match("Unknown_Parameter")
-        assert result is None
+@pytest.mark.parametrize("header, expected", [
+    pytest.param("Power_Output", "Power_Output", id="power-output"),
+    pytest.param("Temperature", "Temperature", id="temperature"),
+    pytest.param("Efficiency", "Efficiency", id="efficiency"),
+    pytest.param("POWER_OUTPUT", "Power_Output", id="case-insensitive"),
+    pytest.param("Power Output", "Power_Output", id="spaces"),
+    pytest.param("Power-Output", "Power_Output", id="hyphens"),
+    pytest.param("  Power_Output  ", "Power_Output", id="whitespace"),
+    # Punctuation other than spaces, hyphens and underscores is stripped too
+    pytest.param("(Emissions.CO2)", "Emissions_CO2", id="punctuation"),
+    pytest.param("Unknown_Parameter", None, id="unknown-parameter"),
+])
+def test_exact_match(registry, header, expected):
+    """Test exact match lookup for known, variant and unknown headers."""
+    assert registry.exact_match(header) == expected
 
 
-class TestExtractAsset:
-    """Unit tests for extract_asset with sample headers."""
-    
-    def test_extract_asset_power_tg1(self, registry):
-        """Test extract_asset with 'Power TG1' header."""
-        result = registry.extract_asset("Power TG1")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "TG"
-        assert asset_id == "TG1"
-    
-    def test_extract_asset_afbc2_temperature(self, registry):
-        """Test extract_asset with 'AFBC-2 Temperature' header."""
-        result = registry.extract_asset("AFBC-2 Temperature")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "AFBC"
-        assert asset_id == "AFBC-2"
-    
-    def test_extract_asset_tg_with_hyphen(self, registry):
-        """Test extract_asset with TG-1 format."""
-        result = registry.extract_asset("TG-1 Power Output")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "TG"
-        assert asset_id == "TG-1"
-    
-    def test_extract_asset_tg_with_underscore(self, registry):
-        """Test extract_asset with TG_2 format."""
-        result = registry.extract_asset("TG_2 Efficiency")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "TG"
-        assert asset_id == "TG_2"
-    
-    def test_extract_asset_esp(self, registry):
-        """Test extract_asset with ESP asset."""
-        result = registry.extract_asset("ESP-3 Status")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "ESP"
-        assert asset_id == "ESP-3"
-    
-    def test_extract_asset_aph(self, registry):
-        """Test extract_asset with APH asset."""
-        result = registry.extract_asset("APH1 Temperature")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "APH"
-        assert asset_id == "APH1"
-    
-    def test_extract_asset_fd_fan(self, registry):
-        """Test extract_asset with FD_FAN asset."""
-        result = registry.extract_asset("FDFAN-2 Speed")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "FD_FAN"
-        assert asset_id == "FDFAN-2"
-    
-    def test_extract_asset_id_fan(self, registry):
-        """Test extract_asset with ID_FAN asset."""
-        result = registry.extract_asset("ID-FAN-1 Current")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "ID_FAN"
-        assert asset_id == "ID-FAN-1"
-    
-    def test_extract_asset_boiler(self, registry):
-        """Test extract_asset with BOILER asset."""
-        result = registry.extract_asset("BOILER-1 Pressure")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "BOILER"
-        assert asset_id == "BOILER-1"
+def test_normalize_drops_non_ascii(registry):
+    """Test normalization keeps only ASCII lowercase letters and digits."""
+    assert registry._normalize("Tempé-rature °C") == "tempraturec"
+
+
+# extract_asset with sample headers
+
+
+@pytest.mark.parametrize("header, expected", [
+    pytest.param("Power TG1", ("TG", "TG1"), id="power-tg1"),
+    pytest.param("AFBC-2 Temperature", ("AFBC", "AFBC-2"), id="afbc2-temperature"),
+    pytest.param("TG-1 Power Output", ("TG", "TG-1"), id="tg-with-hyphen"),
+    pytest.param("TG_2 Efficiency", ("TG", "TG_2"), id="tg-with-underscore"),
+    pytest.param("ESP-3 Status", ("ESP", "ESP-3"), id="esp"),
+    pytest.param("APH1 Temperature", ("APH", "APH1"), id="aph"),
+    pytest.param("FDFAN-2 Speed", ("FD_FAN", "FDFAN-2"), id="fd-fan"),
+    pytest.param("ID-FAN-1 Current", ("ID_FAN", "ID-FAN-1"), id="id-fan"),
+    pytest.param("BOILER-1 Pressure", ("BOILER", "BOILER-1"), id="boiler"),
+    # Case-insensitive; the identifier keeps the header's own casing
+    pytest.param("power tg1", ("TG", "tg1"), id="case-insensitive"),
+    pytest.param("Temperature", None, id="no-match"),
+    # With several assets present, the leftmost wins regardless of type order
+    pytest.param("AFBC-1 TG-2 Power", ("AFBC", "AFBC-1"), id="multiple-assets-returns-first"),
+    pytest.param("TG-2 AFBC-1 Power", ("TG", "TG-2"), id="multiple-assets-returns-leftmost"),
+])
+def test_extract_asset(registry, header, expected):
+    """Test extract_asset returns (asset_type, asset_id) or None for sample headers."""
+    assert registry.extract_asset(header) == expected
+
+
+@pytest.mark.parametrize("headers", [
+    pytest.param(["Power TG1", "Temperature", "ID-FAN-1 Current", "TG-2 AFBC-1 Power"], id="mixed"),
+    pytest.param([], id="empty"),
+])
+def test_extract_asset_many(registry, headers):
+    """Test batch extraction matches extract_asset header by header."""
+    assert registry.extract_asset_many(headers) == [registry.extract_asset(h) for h in headers]
+
+
+def test_extract_asset_fields_by_name(registry):
+    """Test the extracted asset exposes its type and identifier by name."""
+    asset = registry.extract_asset("AFBC-2 Temperature")
     
-    def test_extract_asset_case_insensitive(self, registry):
-        """Test extract_asset is case insensitive."""
-        result = registry.extract_asset("power tg1")
-        assert result is not None
-        asset_type, asset_id = result
-        assert asset_type == "TG"
-        assert asset_id.upper() == "TG1"
+    assert asset.asset_type == "AFBC"
+    assert asset.asset_id == "AFBC-2"
+
+
+def test_extract_asset_repeated_header_cached(registry):
+    """Test that a repeated header is answered from the shared cache."""
+    from app.registry.data import _search_asset
     
-    def test_extract_asset_no_match(self, registry):
-        """Test extract_asset returns None when no asset found."""
-        result = registry.extract_asset("Temperature")
-        assert result is None
+    _search_asset.cache_clear()
+    first = registry.extract_asset("Power TG1")
+    second = registry.extract_asset("Power TG1")
     
-    def test_extract_asset_multiple_assets_returns_first(self, registry):
-        """Test extract_asset returns first match when multiple assets present."""
-        result = registry.extract_asset("AFBC-1 TG-2 Power")
-        assert result is not None
-        # Should return the first match found
-        asset_type, asset_id = result
-        assert asset_type in ["AFBC", "TG"]
+    assert second == first == ("TG", "TG1")
+    assert _search_asset.cache_info().hits == 1